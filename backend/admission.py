@@ -0,0 +1,203 @@
+# ADMISSION CONTROL, PER-SESSION SERIALIZATION AND UPSTREAM LIMITS
+#
+# Every chat turn takes a ticket before it touches the graph:
+# 1. the session's lock, so two messages on one session_id apply in order
+#    (at most CHAT_SESSION_MAX_PENDING may wait per session)
+# 2. one of CHAT_MAX_CONCURRENCY global slots, waiting in a bounded queue
+#    (CHAT_MAX_QUEUE) for at most CHAT_QUEUE_TIMEOUT seconds
+# A full queue is rejected with 429, a wait that times out with 503; both carry
+# a Retry-After estimate. upstream(name) bounds concurrent calls per upstream
+# service (gpt-4o, embeddings, Tavily); MCP and RAG keep their own limits.
+
+import os
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHAT_MAX_CONCURRENCY = int(os.getenv("CHAT_MAX_CONCURRENCY", "32"))
+CHAT_MAX_QUEUE = int(os.getenv("CHAT_MAX_QUEUE", "64"))
+CHAT_QUEUE_TIMEOUT = float(os.getenv("CHAT_QUEUE_TIMEOUT", "30"))
+CHAT_SESSION_MAX_PENDING = int(os.getenv("CHAT_SESSION_MAX_PENDING", "4"))
+
+UPSTREAM_LIMITS = {
+    "openai": int(os.getenv("OPENAI_MAX_CONCURRENCY", "16")),
+    "embeddings": int(os.getenv("EMBEDDINGS_MAX_CONCURRENCY", "8")),
+    "tavily": int(os.getenv("TAVILY_MAX_CONCURRENCY", "4")),
+}
+# Tools whose calls count against an upstream limit
+TOOL_UPSTREAMS = {"web_search_tool": "tavily"}
+
+
+class Overloaded(Exception):
+    """Raised when a turn is not admitted; the API maps it to 429/503 + Retry-After"""
+
+    def __init__(self, status_code, reason, retry_after):
+        super().__init__(f"Server busy ({reason}), retry in {retry_after}s")
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency=CHAT_MAX_CONCURRENCY,
+        max_queue=CHAT_MAX_QUEUE,
+        queue_timeout=CHAT_QUEUE_TIMEOUT,
+        session_max_pending=CHAT_SESSION_MAX_PENDING,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.session_max_pending = session_max_pending
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._sessions = {}  # session_id -> [lock, tickets held or waiting]
+        self.waiting = 0
+        self.active = 0
+        self.admitted = 0
+        self.rejected = {"queue_full": 0, "session_busy": 0, "timeout": 0}
+        self.wait_ms_total = 0.0
+        self.wait_ms_max = 0.0
+        # Moving average of turn duration, used for Retry-After
+        self.avg_turn_s = 1.0
+
+    def retry_after(self):
+        backlog = (self.waiting + 1) / self.max_concurrency
+        return max(1, math.ceil(self.avg_turn_s * backlog))
+
+    def _reject(self, status_code, reason):
+        self.rejected[reason] += 1
+        _metric("rejected", reason)
+        raise Overloaded(status_code, reason, self.retry_after())
+
+    async def acquire(self, session_id):
+        """Wait for the session lock and a global slot; returns a ticket for release()"""
+        if self.waiting >= self.max_queue:
+            self._reject(429, "queue_full")
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            entry = self._sessions[session_id] = [asyncio.Lock(), 0]
+        elif entry[1] >= self.session_max_pending:
+            self._reject(429, "session_busy")
+
+        entry[1] += 1
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._acquire(entry[0]), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._forget(session_id, entry)
+            self._reject(503, "timeout")
+        except BaseException:
+            self._forget(session_id, entry)
+            raise
+        finally:
+            self.waiting -= 1
+
+        waited = time.perf_counter() - started
+        self.wait_ms_total += waited * 1000
+        self.wait_ms_max = max(self.wait_ms_max, waited * 1000)
+        self.admitted += 1
+        self.active += 1
+        _metric("wait", waited)
+        return {"session_id": session_id, "entry": entry, "admitted_at": time.perf_counter()}
+
+    async def _acquire(self, lock):
+        await lock.acquire()
+        try:
+            await self._slots.acquire()
+        except BaseException:
+            lock.release()
+            raise
+
+    def release(self, ticket):
+        """Give back the slot and session lock (safe to call more than once)"""
+        if ticket.get("released"):
+            return
+        ticket["released"] = True
+        self.active -= 1
+        elapsed = time.perf_counter() - ticket["admitted_at"]
+        self.avg_turn_s = 0.9 * self.avg_turn_s + 0.1 * elapsed
+        self._slots.release()
+        ticket["entry"][0].release()
+        self._forget(ticket["session_id"], ticket["entry"])
+
+    def _forget(self, session_id, entry):
+        entry[1] -= 1
+        if entry[1] == 0 and self._sessions.get(session_id) is entry:
+            del self._sessions[session_id]
+
+    @asynccontextmanager
+    async def admit(self, session_id):
+        ticket = await self.acquire(session_id)
+        try:
+            yield
+        finally:
+            self.release(ticket)
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "sessions": len(self._sessions),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "avg_wait_ms": round(self.wait_ms_total / self.admitted, 1) if self.admitted else 0.0,
+            "max_wait_ms": round(self.wait_ms_max, 1),
+            "upstreams": {
+                name: {"limit": UPSTREAM_LIMITS[name], "in_use": in_use}
+                for name, in_use in _upstream_in_use.items()
+            },
+        }
+
+
+admission = AdmissionController()
+
+
+def _metric(kind, value):
+    from telemetry import get_metrics
+
+    metrics = get_metrics()
+    if metrics is None:
+        return
+    if kind == "wait":
+        metrics["queue_wait_seconds"].observe(value)
+    else:
+        metrics["admission_rejected"].labels(value).inc()
+
+
+# PER-UPSTREAM CONCURRENCY
+
+_upstreams = {name: asyncio.Semaphore(limit) for name, limit in UPSTREAM_LIMITS.items()}
+_upstream_in_use = {name: 0 for name in UPSTREAM_LIMITS}
+
+
+@asynccontextmanager
+async def upstream(name):
+    """Hold one of the upstream's UPSTREAM_LIMITS slots for the duration of a call"""
+    async with _upstreams[name]:
+        _upstream_in_use[name] += 1
+        try:
+            yield
+        finally:
+            _upstream_in_use[name] -= 1
+
+
+def with_upstream_limit(name, call):
+    """`call` holding an upstream slot, if the tool counts against one"""
+    service = TOOL_UPSTREAMS.get(name)
+    if service is None:
+        return call
+
+    async def limited(**kwargs):
+        async with upstream(service):
+            return await call(**kwargs)
+
+    return limited
@@ -2,12 +2,17 @@
 
 import os
 import sys
+import json
+import time
+import asyncio
+from contextlib import asynccontextmanager
 from pathlib import Path
-from fastapi import FastAPI
+from fastapi import FastAPI, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import HumanMessage, AIMessage
 from fastapi.middleware.cors import CORSMiddleware
-from langgraph.checkpoint.memory import InMemorySaver
+from starlette.background import BackgroundTask
 from dotenv import load_dotenv
 import uuid
 
@@ -15,13 +20,87 @@ import uuid
 current_dir = Path(__file__).parent
 sys.path.insert(0, str(current_dir))
 
-from graph import graph
+import graph
+from graph import build_agent, get_prompt_cache_stats, load_tools
+from config import aping_mongo, close_clients, ping_mongo, pool_stats
+from checkpointer import open_checkpointer
+from tools.rag import cache_stats, aembed_query_cached, check_kb_version, get_prefetch_stats
+from tools.rag import warm_up as warm_up_rag
+from tools.github_mcp import MCP_REQUIRED, close_mcp_pool, mcp_stats
+from tool_cache import tool_cache_stats
+import router
+from telemetry import METRICS, callbacks, render_metrics, request_span
+from admission import Overloaded, admission
+from batch import BATCH_MAX_CONCURRENCY, parse_jsonl, run_batch
+from history import SUMMARY_TAG
+from deadlines import get_deadline_stats
+from compact import get_compaction_stats
+from response_cache import (
+    SEMANTIC_CACHE,
+    SEMANTIC_CACHE_FIRST_TURN_ONLY,
+    semantic_cache,
+    scope_for,
+)
 
 load_dotenv()
 
 app_name = os.getenv("APP_NAME")
-app = FastAPI(title="Aayushmaan Personal Agent")
-memory = InMemorySaver()
+
+# Startup readiness: /healthz reports "not ready" until every component is warm
+readiness = {"agent": False, "tools": False, "mcp": False, "vector_store": False}
+
+
+def is_ready():
+    # With MCP_REQUIRED=false a missing GitHub server is reported but not gating
+    return all(ok for name, ok in readiness.items() if name != "mcp" or MCP_REQUIRED)
+
+
+async def warm(name, coro):
+    """Run one warm-up step; a failure leaves the app up but not ready"""
+    started = time.perf_counter()
+    try:
+        result = await coro
+    except Exception as e:
+        print(f"⚠️ Warm-up step {name} failed: {e}")
+        result = None
+    print(f"⏱️ {name} warm in {time.perf_counter() - started:.2f}s")
+    return result
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Bounded / persistent conversation store (see checkpointer.py)
+    async with open_checkpointer() as memory:
+        app.state.checkpointer = memory
+        started = time.perf_counter()
+
+        # Spawn the MCP server, connect MongoDB and open the vector store concurrently
+        tools, mongo_ok, mongo_async_ok, rag_ok = await asyncio.gather(
+            warm("tools", load_tools()),
+            warm("mongo", asyncio.to_thread(ping_mongo)),
+            warm("mongo_async", aping_mongo()),
+            warm("vector_store", asyncio.to_thread(lambda: warm_up_rag() or True)),
+        )
+        # The base tools are always there; the GitHub MCP tools only if the server started
+        readiness["tools"] = tools is not None
+        readiness["mcp"] = bool(graph.mcp_tools)
+        readiness["vector_store"] = bool(mongo_ok and mongo_async_ok and rag_ok)
+
+        # Compile the agent once and share it across all requests
+        app.state.agent = build_agent(checkpointer=memory)
+        readiness["agent"] = True
+
+        app.state.startup_seconds = time.perf_counter() - started
+        print(f"✅ Startup complete in {app.state.startup_seconds:.2f}s: {readiness}")
+        try:
+            yield
+        finally:
+            # Stop the pooled GitHub MCP server processes and the MongoDB pools
+            await close_mcp_pool()
+            await close_clients()
+
+
+app = FastAPI(title="Aayushmaan Personal Agent", lifespan=lifespan)
 
 origins = [
     "https://aayush-bot-tf6k.vercel.app",
@@ -41,9 +120,20 @@ app.add_middleware(
 )
 
 
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request, exc: Overloaded):
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": str(exc), "reason": exc.reason},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 class ChatRequest(BaseModel):
     message: str
     session_id: str = None
+    # Skip the semantic answer cache for this request
+    no_cache: bool = False
 
 
 class ChatResponse(BaseModel):
@@ -53,7 +143,42 @@ class ChatResponse(BaseModel):
 
 @app.get("/healthz", tags=["meta"])
 async def healthz():
-    return {"status": "Server is running", "service": app_name}
+    if not is_ready():
+        return JSONResponse(
+            status_code=503,
+            content={"status": "not ready", "service": app_name, "checks": readiness},
+        )
+    return {
+        "status": "Server is running",
+        "service": app_name,
+        "checks": readiness,
+        "sessions": await app.state.checkpointer.stats(),
+        "caches": cache_stats() + [semantic_cache.stats(), tool_cache_stats()],
+        "mcp": mcp_stats(),
+        "router": router.stats(),
+        "prompt_cache": get_prompt_cache_stats(),
+        "tool_deadlines": get_deadline_stats(),
+        "tool_compaction": get_compaction_stats(),
+        "rag_prefetch": get_prefetch_stats(),
+        "admission": admission.stats(),
+        "mongo": pool_stats(),
+    }
+
+
+@app.get("/metrics", tags=["meta"])
+async def metrics():
+    """Prometheus metrics (METRICS=true)"""
+    if not METRICS:
+        return JSONResponse(status_code=404, content={"detail": "Metrics are disabled"})
+    sessions = None
+    if hasattr(app.state, "checkpointer"):
+        sessions = (await app.state.checkpointer.stats())["sessions"]
+    body, content_type = render_metrics(
+        caches=cache_stats() + [semantic_cache.stats(), tool_cache_stats()],
+        sessions=sessions,
+        admission=admission.stats(),
+    )
+    return Response(content=body, media_type=content_type)
 
 
 @app.post("/https://aayushbot-1.onrender.com")
@@ -63,31 +188,181 @@ async def reload():
 
 @app.post("/chat", response_model=ChatResponse)
 async def chat(request: ChatRequest):
-    try:
-        #  compile the graph
-        agent = graph.compile(checkpointer=memory)
-        # Generate or use existing session ID
-        session_id = request.session_id or str(uuid.uuid4())
+    # Generate or use existing session ID
+    session_id = request.session_id or str(uuid.uuid4())
 
-        # Create config with session-specific thread ID
-        config = {"configurable": {"thread_id": session_id}}
+    # Turns on one session run in order; a full queue raises Overloaded (429/503)
+    with request_span("/chat"):
+        async with admission.admit(session_id):
+            try:
+                # Use the agent compiled once at startup
+                agent = app.state.agent
 
-        # Create a human message from the request
-        human_message = HumanMessage(content=request.message)
+                # Create config with session-specific thread ID
+                config = {"configurable": {"thread_id": session_id}, "callbacks": callbacks()}
 
-        # Invoke the agent with the message and session config
-        # The checkpointer will automatically merge this with existing conversation history
-        result = await agent.ainvoke({"messages": [human_message]}, config=config)
+                # Create a human message from the request
+                human_message = HumanMessage(content=request.message)
 
-        # Extract the last message content as the response
-        response_content = result["messages"][-1].content
+                # Semantic answer cache (optional, see response_cache.py)
+                query_vector = None
+                if SEMANTIC_CACHE and not request.no_cache:
+                    first_turn = True
+                    if SEMANTIC_CACHE_FIRST_TURN_ONLY and request.session_id:
+                        snapshot = await agent.aget_state(config)
+                        first_turn = not snapshot.values.get("messages")
+                    if first_turn:
+                        query_vector = await aembed_query_cached(request.message)
+                        cached = semantic_cache.lookup(query_vector, check_kb_version())
+                        if cached is not None:
+                            # Record the turn so follow-up questions still have context
+                            await agent.aupdate_state(
+                                config,
+                                {"messages": [human_message, AIMessage(content=cached)]},
+                                as_node="agent",
+                            )
+                            return ChatResponse(answer=cached, session_id=session_id)
 
-        return ChatResponse(answer=response_content, session_id=session_id)
-    except Exception as e:
-        session_id = request.session_id or str(uuid.uuid4())
-        return ChatResponse(
-            answer=f"Sorry, I encountered an error: {str(e)}", session_id=session_id
-        )
+                # Invoke the agent with the message and session config
+                # The checkpointer will automatically merge this with existing conversation history
+                result = await agent.ainvoke({"messages": [human_message]}, config=config)
+
+                # Extract the last message content as the response
+                response_content = result["messages"][-1].content
+
+                if query_vector is not None:
+                    semantic_cache.store(
+                        query_vector,
+                        response_content,
+                        scope_for(result["messages"]),
+                        check_kb_version(),
+                    )
+
+                return ChatResponse(answer=response_content, session_id=session_id)
+            except Exception as e:
+                return ChatResponse(
+                    answer=f"Sorry, I encountered an error: {str(e)}", session_id=session_id
+                )
+
+
+def sse(event: str, data: dict) -> str:
+    """Format one Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def stream_chat_events(agent, message: str, session_id: str, ticket=None):
+    """Yield SSE frames for LLM tokens and tool start/end events of one turn.
+
+    `ticket` is the admission ticket taken by the endpoint; it is released
+    when the stream ends or the client disconnects."""
+    config = {"configurable": {"thread_id": session_id}, "callbacks": callbacks()}
+    started = time.perf_counter()
+    first_token_ms = None
+    answer = ""
+
+    yield sse("session", {"session_id": session_id})
+    with request_span("/chat/stream"):
+        try:
+            async for event in agent.astream_events(
+                {"messages": [HumanMessage(content=message)]},
+                config=config,
+                version="v2",
+            ):
+                kind = event["event"]
+                node = event.get("metadata", {}).get("langgraph_node")
+                # The rolling-summary call also runs inside the agent node
+                if SUMMARY_TAG in event.get("tags", ()):
+                    continue
+
+                # Only stream tokens from the agent node, not the nested RAG chain LLM
+                if kind == "on_chat_model_stream" and node == "agent":
+                    chunk = event["data"]["chunk"]
+                    if chunk.content:
+                        if first_token_ms is None:
+                            first_token_ms = (time.perf_counter() - started) * 1000
+                        answer += chunk.content
+                        yield sse("token", {"content": chunk.content})
+                elif kind == "on_chat_model_end" and node == "agent":
+                    # A new agent step starts a fresh answer (tokens before tool calls are not final)
+                    if getattr(event["data"].get("output"), "tool_calls", None):
+                        answer = ""
+                elif kind == "on_chain_end" and node == "router" and event["name"] == "router":
+                    # Fast-path answers skip the LLM, so send them as a single token
+                    output = event["data"].get("output") or {}
+                    reply = output.get("messages") if isinstance(output, dict) else None
+                    if reply and reply[-1].content:
+                        first_token_ms = (time.perf_counter() - started) * 1000
+                        answer = reply[-1].content
+                        yield sse("token", {"content": answer})
+                elif kind == "on_tool_start":
+                    yield sse(
+                        "tool_start",
+                        {"name": event["name"], "input": event["data"].get("input")},
+                    )
+                elif kind == "on_tool_end":
+                    output = event["data"].get("output")
+                    output = getattr(output, "content", output)
+                    yield sse(
+                        "tool_end", {"name": event["name"], "output": str(output)[:500]}
+                    )
+
+            yield sse(
+                "done",
+                {
+                    "answer": answer,
+                    "session_id": session_id,
+                    "ttft_ms": first_token_ms,
+                    "total_ms": (time.perf_counter() - started) * 1000,
+                },
+            )
+        except Exception as e:
+            yield sse(
+                "error",
+                {"answer": f"Sorry, I encountered an error: {str(e)}", "session_id": session_id},
+            )
+        finally:
+            if ticket is not None:
+                admission.release(ticket)
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    session_id = request.session_id or str(uuid.uuid4())
+    # Admit before the response starts so overload still gets a 429/503 status
+    ticket = await admission.acquire(session_id)
+    return StreamingResponse(
+        stream_chat_events(app.state.agent, request.message, session_id, ticket),
+        # Also release if the stream never starts (release is idempotent)
+        background=BackgroundTask(admission.release, ticket),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def stream_batch_results(agent, items, concurrency):
+    """JSONL lines for run_batch(): one per question, then the summary"""
+    with request_span("/chat/batch", questions=len(items)):
+        async for result in run_batch(agent, items, concurrency):
+            yield json.dumps(result, default=str) + "\n"
+
+
+@app.post("/chat/batch")
+async def chat_batch(
+    request: Request,
+    concurrency: int = Query(BATCH_MAX_CONCURRENCY, ge=1),
+):
+    """Run a JSONL body of questions (see batch.py) and stream JSONL results"""
+    try:
+        items = parse_jsonl((await request.body()).decode("utf-8").splitlines())
+    except (UnicodeDecodeError, ValueError) as e:
+        return JSONResponse(status_code=400, content={"detail": str(e)})
+    # Never ask for more slots than admission control has
+    concurrency = min(concurrency, admission.max_concurrency)
+    return StreamingResponse(
+        stream_batch_results(app.state.agent, items, concurrency),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 # local run: uvicorn api:app --host 0.0.0.0 --port 8000
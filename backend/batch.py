@@ -0,0 +1,253 @@
+# BATCH EVALUATION: MANY QUESTIONS THROUGH THE SHARED GRAPH
+#
+# Input is JSONL, one question per line:
+#   {"question": "Where did you study?"}
+#   {"id": "bday-1", "session": "bday", "question": "When were you born?"}
+#   {"id": "bday-2", "session": "bday", "question": "How old does that make you?"}
+# Lines sharing a "session" are turns of one conversation and run in file
+# order; sessions (and lines without one) run in parallel, at most
+# `concurrency` turns at a time. Each run gets fresh thread ids, so a batch
+# never reuses history from a previous run or a real user.
+#
+# Output is JSONL in completion order: one result per question (answer, tool
+# calls, timing) and a final {"summary": ...} line.
+#
+#   python batch.py questions.jsonl [--concurrency 8] [-o results.jsonl]
+#   python batch.py questions.jsonl --url http://localhost:8000   # via POST /chat/batch
+#
+# Without --url the CLI starts the app in-process (same startup as the API).
+
+import os
+import sys
+import json
+import time
+import uuid
+import asyncio
+import argparse
+
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage
+
+from admission import Overloaded, admission
+from telemetry import callbacks, get_logger
+
+load_dotenv()
+
+log = get_logger("batch")
+
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+
+
+def parse_jsonl(lines):
+    """Parse question lines into items; raises ValueError naming the bad line"""
+    items = []
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        try:
+            data = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: invalid JSON ({e})") from None
+        if not isinstance(data, dict):
+            data = {}
+        question = data.get("question") or data.get("message")
+        if not isinstance(question, str) or not question.strip():
+            raise ValueError(f'line {number}: expected {{"question": "..."}}')
+        items.append(
+            {
+                "id": str(data.get("id", number)),
+                "line": number,
+                "session": data.get("session"),
+                "question": question,
+            }
+        )
+        if len(items) > BATCH_MAX_ITEMS:
+            raise ValueError(f"more than BATCH_MAX_ITEMS ({BATCH_MAX_ITEMS}) questions")
+    return items
+
+
+def group_sessions(items):
+    """Conversations in file order: lines sharing a session, or one line alone"""
+    sessions = {}
+    for item in items:
+        key = item["session"] if item["session"] is not None else f"line-{item['line']}"
+        sessions.setdefault(str(key), []).append(item)
+    return sessions
+
+
+def turn_tool_calls(messages):
+    """Tool calls made since the last HumanMessage, in call order"""
+    calls = []
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        if isinstance(msg, AIMessage):
+            calls[:0] = [{"name": tc["name"], "args": tc.get("args", {})} for tc in msg.tool_calls]
+    return calls
+
+
+def percentile(values, p):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+async def run_batch(agent, items, concurrency=BATCH_MAX_CONCURRENCY):
+    """Yield one result dict per item as it finishes, then a summary dict.
+
+    Every turn also takes an admission ticket, so a batch shares the global
+    chat slots with live traffic instead of starving it.
+    """
+    run_id = uuid.uuid4().hex[:8]
+    slots = asyncio.Semaphore(max(1, concurrency))
+    results = asyncio.Queue()
+    started = time.perf_counter()
+
+    async def ask(item, thread_id, turn):
+        config = {"configurable": {"thread_id": thread_id}, "callbacks": callbacks()}
+        result = {
+            "id": item["id"],
+            "line": item["line"],
+            "session": item["session"],
+            "turn": turn,
+            "question": item["question"],
+        }
+        async with slots:
+            turn_started = time.perf_counter()
+            result["start_ms"] = round((turn_started - started) * 1000, 1)
+            try:
+                async with admission.admit(thread_id):
+                    admitted = time.perf_counter()
+                    output = await agent.ainvoke(
+                        {"messages": [HumanMessage(content=item["question"])]}, config=config
+                    )
+                messages = output["messages"]
+                result.update(
+                    ok=True,
+                    answer=messages[-1].content,
+                    tool_calls=turn_tool_calls(messages),
+                    queue_ms=round((admitted - turn_started) * 1000, 1),
+                )
+            except Overloaded as e:
+                result.update(ok=False, error=str(e))
+            except Exception as e:
+                log.warning("⚠️ Batch question %s failed: %s", item["id"], e)
+                result.update(ok=False, error=str(e))
+            result["ms"] = round((time.perf_counter() - turn_started) * 1000, 1)
+        await results.put(result)
+
+    async def conversation(key, turns):
+        thread_id = f"batch-{run_id}-{key}"
+        for turn, item in enumerate(turns, 1):
+            await ask(item, thread_id, turn)
+
+    sessions = group_sessions(items)
+    tasks = [asyncio.create_task(conversation(k, turns)) for k, turns in sessions.items()]
+    latencies, errors = [], 0
+    try:
+        for _ in range(len(items)):
+            result = await results.get()
+            if result["ok"]:
+                latencies.append(result["ms"])
+            else:
+                errors += 1
+            yield result
+    finally:
+        # Client went away: stop the remaining questions
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    wall = time.perf_counter() - started
+    yield {
+        "summary": {
+            "run_id": run_id,
+            "questions": len(items),
+            "sessions": len(sessions),
+            "errors": errors,
+            "concurrency": concurrency,
+            "wall_ms": round(wall * 1000, 1),
+            "throughput_qps": round(len(items) / wall, 2) if wall else 0.0,
+            "p50_ms": percentile(latencies, 50),
+            "p95_ms": percentile(latencies, 95),
+            "max_ms": max(latencies, default=0.0),
+        }
+    }
+
+
+# CLI
+
+
+async def _run_local(items, concurrency, out):
+    from app import app
+
+    async with app.router.lifespan_context(app):
+        async for result in run_batch(app.state.agent, items, concurrency):
+            _emit(result, out)
+
+
+def _run_remote(url, text, concurrency, out):
+    from urllib.request import Request, urlopen
+
+    request = Request(
+        f"{url.rstrip('/')}/chat/batch?concurrency={concurrency}",
+        data=text.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
+    with urlopen(request) as response:
+        for line in response:
+            if line.strip():
+                _emit(json.loads(line), out)
+
+
+def _emit(result, out):
+    out.write(json.dumps(result, default=str) + "\n")
+    out.flush()
+    if "summary" in result:
+        s = result["summary"]
+        print(
+            f"📊 {s['questions']} questions in {s['wall_ms'] / 1000:.1f}s "
+            f"({s['throughput_qps']} q/s, p50 {s['p50_ms']} ms, p95 {s['p95_ms']} ms, "
+            f"{s['errors']} errors)",
+            file=sys.stderr,
+        )
+    elif not result["ok"]:
+        print(f"❌ {result['id']}: {result['error']}", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a JSONL question set through the agent")
+    parser.add_argument("questions", help="JSONL file ('-' for stdin)")
+    parser.add_argument("--concurrency", type=int, default=BATCH_MAX_CONCURRENCY)
+    parser.add_argument("--url", help="send to a running API's /chat/batch instead of in-process")
+    parser.add_argument("-o", "--output", help="write JSONL results here (default stdout)")
+    args = parser.parse_args()
+
+    if args.questions == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.questions) as f:
+            text = f.read()
+    try:
+        items = parse_jsonl(text.splitlines())
+    except ValueError as e:
+        sys.exit(f"❌ {args.questions}: {e}")
+
+    out = open(args.output, "w") if args.output else sys.stdout
+    try:
+        if args.url:
+            _run_remote(args.url, text, args.concurrency, out)
+        else:
+            asyncio.run(_run_local(items, args.concurrency, out))
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
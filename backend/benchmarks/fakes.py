@@ -0,0 +1,164 @@
+# Deterministic stand-ins for OpenAI, Voyage, Tavily, Atlas and the GitHub MCP
+# server, used by benchmarks/offline.py. Each fake sleeps for a configurable
+# latency so the real graph, tools wrappers, caches and API run as in production.
+
+import time
+import json
+import asyncio
+import itertools
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.tools import StructuredTool
+from pydantic import BaseModel
+
+from local_index import HashEmbeddings, NumpyVectorStore
+
+# (keyword in the user message, tool to call); first match wins, no match answers directly
+DEFAULT_SCRIPT = [
+    ("github", "search_repositories"),
+    ("repo", "search_repositories"),
+    ("news", "web_search_tool"),
+    ("weather", "web_search_tool"),
+    ("study", "rag_tool"),
+    ("skill", "rag_tool"),
+    ("work", "rag_tool"),
+    ("project", "rag_tool"),
+    ("born", "rag_tool"),
+]
+
+PROFILE_CHUNKS = [
+    "Aayushmaan studied a Master of IT at UNSW Sydney, specialising in AI.",
+    "Aayushmaan's skills include Python, LangGraph, FastAPI, React and MongoDB.",
+    "Aayushmaan worked as a software engineer building agentic AI systems.",
+    "Projects: AayushBot, a personal agent with RAG, web search and GitHub tools.",
+    "Aayushmaan was born in India and moved to Sydney for his studies.",
+    "His nickname is Aayush; he enjoys cricket, Star Wars and Harry Potter.",
+] + [f"Filler knowledge base chunk number {i} about side projects and notes." for i in range(200)]
+
+_call_ids = itertools.count()
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that sleeps `latency` seconds and follows a tool-call script.
+
+    A user message containing a script keyword gets one call to that tool
+    (with the message as the query); any other turn gets a final answer.
+    Usage metadata is filled with approximate token counts.
+    """
+
+    latency: float = 0.05
+    script: list = DEFAULT_SCRIPT
+
+    @property
+    def _llm_type(self):
+        return "scripted-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _respond(self, messages):
+        last = messages[-1]
+        if isinstance(last, HumanMessage):
+            text = last.content.lower()
+            for keyword, tool_name in self.script:
+                if keyword in text:
+                    call_id = f"call_{next(_call_ids)}"
+                    return AIMessage(
+                        content="",
+                        tool_calls=[{"name": tool_name, "args": {"query": last.content}, "id": call_id}],
+                    )
+            return AIMessage(content="Ha, good one. Ask me about Aayushmaan instead!")
+        if isinstance(last, ToolMessage):
+            return AIMessage(content=f"Here's what I found: {str(last.content)[:120]}")
+        return AIMessage(content="Anything else?")
+
+    def _result(self, messages):
+        message = self._respond(messages)
+        input_tokens = count_tokens_approximately(messages)
+        output_tokens = count_tokens_approximately([message])
+        message.usage_metadata = {
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+
+class SlowHashEmbeddings(HashEmbeddings):
+    """HashEmbeddings with a simulated network round trip per query"""
+
+    def __init__(self, latency=0.02, dim=512):
+        super().__init__(dim=dim)
+        self.latency = latency
+
+    def embed_query(self, text):
+        time.sleep(self.latency)
+        return super().embed_query(text)
+
+    async def aembed_query(self, text):
+        await asyncio.sleep(self.latency)
+        return super().embed_query(text)
+
+
+def build_vector_store(index_dir, embed_latency):
+    """Local vector store over a synthetic profile, in a throwaway directory"""
+    store = NumpyVectorStore(SlowHashEmbeddings(embed_latency), index_dir=index_dir, name="bench")
+    store.add_texts(PROFILE_CHUNKS, metadatas=[{"source": "profile.pdf", "page": 0}] * len(PROFILE_CHUNKS))
+    return store
+
+
+class FakeTavily:
+    """Stands in for TavilySearch (tools/web.py calls .invoke synchronously)"""
+
+    def __init__(self, latency=0.2):
+        self.latency = latency
+
+    def invoke(self, request):
+        time.sleep(self.latency)
+        query = request["query"]
+        return {
+            "results": [
+                {"title": f"Result {i} for {query}", "url": f"https://example.com/{i}",
+                 "content": f"Snippet {i} about {query}. " * 20, "score": 0.9 - i / 10}
+                for i in range(2)
+            ]
+        }
+
+
+class _RepoQuery(BaseModel):
+    query: str
+    username: str | None = None
+
+
+def fake_github_tools(latency=0.3):
+    """MCP-shaped search_repositories tool returning a GitHub-like JSON string"""
+
+    async def search_repositories(query: str, username: str | None = None) -> str:
+        await asyncio.sleep(latency)
+        items = [
+            {"full_name": f"aayushmaanhooda/project-{i}", "description": f"Project {i} " * 10,
+             "stargazers_count": i, "language": "Python",
+             "html_url": f"https://github.com/aayushmaanhooda/project-{i}", "owner": {"id": 1}}
+            for i in range(20)
+        ]
+        return json.dumps({"total_count": len(items), "items": items})
+
+    return [
+        StructuredTool(
+            name="search_repositories",
+            description="Search for GitHub repositories",
+            args_schema=_RepoQuery,
+            coroutine=search_repositories,
+        )
+    ]
@@ -0,0 +1,164 @@
+# MongoDB connection reuse / tail latency under concurrency
+#
+#   python benchmarks/mongo_pool.py [--uri mongodb://localhost:27017] [--queries 2000]
+#                                   [--concurrency 64] [--vector-search]
+#
+# Runs the same query N times at the given concurrency with three client setups:
+#   per_call   a new MongoClient per query (no reuse at all)
+#   threadpool one default MongoClient driven from a thread pool
+#              (the previous retrieval path: sync search in run_in_executor)
+#   async      the shared, tuned AsyncMongoClient from config.client_options()
+# and reports p50/p95/p99 latency, throughput and connections the server opened
+# (serverStatus; "n/a" when not permitted). A plain local mongod works: the
+# query is an indexed $match on a seeded collection. --vector-search runs the
+# real $vectorSearch pipeline instead (Atlas or the atlas-local image, using
+# DB_NAME / MONGODB_COLLECTION / ATLAS_VECTOR_SEARCH_INDEX_NAME).
+
+import os, sys, time, asyncio, argparse, random
+from concurrent.futures import ThreadPoolExecutor
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from pymongo import AsyncMongoClient, MongoClient
+
+import config
+
+BENCH_DB = "aayushbot_bench"
+BENCH_COLLECTION = "chunks"
+
+
+def percentile(values, p):
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def seed(uri, docs=2000):
+    client = MongoClient(uri)
+    collection = client[BENCH_DB][BENCH_COLLECTION]
+    if collection.estimated_document_count() < docs:
+        collection.drop()
+        collection.insert_many(
+            [{"chunk_index": i, "bucket": i % 100, "text": f"chunk {i} " * 20} for i in range(docs)]
+        )
+        collection.create_index("bucket")
+    client.close()
+
+
+def make_pipeline(vector_search, dim):
+    if vector_search:
+        from langchain_mongodb.pipelines import vector_search_stage
+
+        vector = [random.uniform(-1, 1) for _ in range(dim)]
+        return [
+            vector_search_stage(vector, "embedding", config.vector_index, 10),
+            {"$project": {"embedding": 0}},
+        ]
+    return [{"$match": {"bucket": random.randrange(100)}}, {"$limit": 10}]
+
+
+def namespace(vector_search):
+    if vector_search:
+        return config.db_name, config.collections
+    return BENCH_DB, BENCH_COLLECTION
+
+
+def connections_created(uri):
+    client = MongoClient(uri)
+    try:
+        return client.admin.command("serverStatus")["connections"]["totalCreated"]
+    except Exception:
+        return None
+    finally:
+        client.close()
+
+
+async def run(name, query, queries, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one():
+        async with semaphore:
+            started = time.perf_counter()
+            await query()
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(queries)))
+    wall = time.perf_counter() - started
+    return {
+        "setup": name,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "qps": queries / wall,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--uri", default=os.getenv("MONGO_BENCH_URI", "mongodb://localhost:27017"))
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--threads", type=int, default=int(os.getenv("RAG_MAX_CONCURRENCY", "8")))
+    parser.add_argument("--vector-search", action="store_true")
+    parser.add_argument("--dim", type=int, default=1024, help="query vector size for --vector-search")
+    args = parser.parse_args()
+
+    if not args.vector_search:
+        seed(args.uri)
+    db, coll = namespace(args.vector_search)
+
+    def sync_query(client):
+        return list(client[db][coll].aggregate(make_pipeline(args.vector_search, args.dim)))
+
+    # per_call: connect, query, close
+    loop = asyncio.get_running_loop()
+    per_call_pool = ThreadPoolExecutor(max_workers=args.threads)
+
+    def per_call():
+        client = MongoClient(args.uri)
+        try:
+            return sync_query(client)
+        finally:
+            client.close()
+
+    # threadpool: one default client, blocking calls offloaded to threads
+    shared_sync = MongoClient(args.uri)
+    sync_pool = ThreadPoolExecutor(max_workers=args.threads)
+
+    # async: the app's shared client settings
+    shared_async = AsyncMongoClient(args.uri, **config.client_options())
+
+    async def async_query():
+        cursor = await shared_async[db][coll].aggregate(make_pipeline(args.vector_search, args.dim))
+        return await cursor.to_list()
+
+    setups = [
+        ("per_call", lambda: loop.run_in_executor(per_call_pool, per_call), args.queries // 10),
+        ("threadpool", lambda: loop.run_in_executor(sync_pool, sync_query, shared_sync), args.queries),
+        ("async", async_query, args.queries),
+    ]
+
+    print(f"{'setup':<12}{'queries':>8}{'p50':>10}{'p95':>10}{'p99':>10}{'qps':>10}{'conns':>8}")
+    for name, query, queries in setups:
+        await query()  # connect / warm the pool outside the measurement
+        before = connections_created(args.uri)
+        result = await run(name, query, queries, args.concurrency)
+        after = connections_created(args.uri)
+        # the two serverStatus probes open one connection each
+        conns = after - before - 1 if before is not None and after is not None else "n/a"
+        print(
+            f"{name:<12}{queries:>8}{result['p50_ms']:>8.1f}ms{result['p95_ms']:>8.1f}ms"
+            f"{result['p99_ms']:>8.1f}ms{result['qps']:>10.0f}{conns:>8}"
+        )
+
+    shared_sync.close()
+    await shared_async.close()
+    per_call_pool.shutdown()
+    sync_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,251 @@
+# Offline benchmark / load test: no OpenAI, Voyage, Tavily, Atlas or GitHub needed
+#
+#   python benchmarks/offline.py [--sessions 50] [--turns 4] [--concurrency 20]
+#                                [--llm-latency 0.05] [--embed-latency 0.02]
+#                                [--tool-latency 0.2] [--mcp-latency 0.3]
+#                                [--save benchmarks/baseline.json]
+#                                [--compare benchmarks/baseline.json] [--tolerance 0.25]
+#
+# Runs the real graph.py StateGraph and the app.py FastAPI app (lifespan, /chat)
+# against the fakes in benchmarks/fakes.py and reports startup time, p50/p95/p99
+# turn latency and throughput for N concurrent sessions (graph and HTTP), and
+# memory growth per session. --save writes the results as a JSON baseline;
+# --compare exits with status 1 when p95 latency, throughput or memory per
+# session regress by more than --tolerance against a saved baseline.
+
+import os, sys, gc, json, time, asyncio, argparse, tempfile, tracemalloc, uuid
+from functools import partial
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+# Offline backends, set before any backend module reads its configuration
+os.environ.update(VECTOR_STORE="local", EMBEDDER="hash", CHECKPOINTER="memory")
+# Vector-only retrieval: a tools/profile.bm25.json from a real ingest would
+# otherwise be fused into the synthetic corpus and make runs depend on local state
+os.environ.update(RAG_HYBRID="false")
+os.environ.setdefault("SEMANTIC_CACHE", "false")
+os.environ.setdefault("HISTORY_SUMMARIZE", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+QUESTIONS = [
+    "Where did you study?",
+    "What are your skills?",
+    "Show me your GitHub repos",
+    "What's in the news today?",
+    "What time is it?",
+    "Tell me about your work experience",
+    "Tell me a joke",
+    "What projects have you built?",
+]
+
+
+def percentile(values, p):
+    """Nearest-rank percentile"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = max(0, min(len(ordered) - 1, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def summarize(latencies, wall_s):
+    return {
+        "turns": len(latencies),
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies) * 1000, 1),
+        "throughput_tps": round(len(latencies) / wall_s, 2),
+    }
+
+
+def install_fakes(args, index_dir):
+    """Point the backend at the fakes (vector store, Tavily, MCP, RAG mode)"""
+    import config
+    import graph
+    import tools.rag as rag
+    import tools.web as web
+    from benchmarks.fakes import FakeTavily, build_vector_store, fake_github_tools
+
+    config._vector_store = build_vector_store(index_dir, args.embed_latency)
+    web._web_search = FakeTavily(args.tool_latency)
+    rag.RAG_MODE = "retrieve"  # the nested synthesis LLM would need OpenAI
+
+    async def get_mcp_tools():
+        return fake_github_tools(args.mcp_latency), "aayushmaanhooda"
+
+    graph.get_mcp_tools = get_mcp_tools
+
+
+async def run_sessions(send, sessions, turns, concurrency):
+    """Run `sessions` conversations of `turns` messages, at most `concurrency` at once"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def session(index):
+        async with semaphore:
+            session_id = str(uuid.uuid4())
+            for turn in range(turns):
+                question = QUESTIONS[(index + turn) % len(QUESTIONS)]
+                started = time.perf_counter()
+                await send(question, session_id)
+                latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(session(i) for i in range(sessions)))
+    return summarize(latencies, time.perf_counter() - started)
+
+
+async def bench_graph(args):
+    from langchain_core.messages import HumanMessage
+    from benchmarks.fakes import ScriptedChatModel
+    from checkpointer import open_checkpointer
+    from graph import build_agent, load_tools
+
+    await load_tools()
+    async with open_checkpointer("memory") as memory:
+        agent = build_agent(checkpointer=memory, llm=ScriptedChatModel(latency=args.llm_latency))
+
+        async def send(question, session_id):
+            config = {"configurable": {"thread_id": session_id}}
+            await agent.ainvoke({"messages": [HumanMessage(content=question)]}, config)
+
+        return await run_sessions(send, args.sessions, args.turns, args.concurrency)
+
+
+async def bench_http(args):
+    import httpx
+    import app as app_module
+    from benchmarks.fakes import ScriptedChatModel
+
+    app_module.build_agent = partial(
+        app_module.build_agent, llm=ScriptedChatModel(latency=args.llm_latency)
+    )
+    app = app_module.app
+
+    started = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        startup_s = time.perf_counter() - started
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            health = await client.get("/healthz")
+
+            async def send(question, session_id):
+                response = await client.post(
+                    "/chat", json={"message": question, "session_id": session_id}
+                )
+                response.raise_for_status()
+
+            result = await run_sessions(send, args.sessions, args.turns, args.concurrency)
+    return {"startup_ms": round(startup_s * 1000, 1), "ready": health.status_code == 200, **result}
+
+
+async def bench_memory(args):
+    """Traced heap growth per session (graph + in-memory checkpointer)"""
+    from langchain_core.messages import HumanMessage
+    from benchmarks.fakes import ScriptedChatModel
+    from checkpointer import open_checkpointer
+    from graph import build_agent
+
+    async with open_checkpointer("memory") as memory:
+        agent = build_agent(checkpointer=memory, llm=ScriptedChatModel(latency=0))
+
+        async def send(question, session_id):
+            config = {"configurable": {"thread_id": session_id}}
+            await agent.ainvoke({"messages": [HumanMessage(content=question)]}, config)
+
+        # Warm every code path first so one-off allocations are not counted
+        await run_sessions(send, len(QUESTIONS), 1, len(QUESTIONS))
+        gc.collect()
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        await run_sessions(send, args.memory_sessions, args.turns, args.concurrency)
+        gc.collect()
+        after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        stats = await memory.stats()
+    return {
+        "sessions": args.memory_sessions,
+        "bytes_per_session": round((after - before) / args.memory_sessions),
+        "checkpointer": stats,
+    }
+
+
+# Metrics compared against a baseline: (section, key, higher is better)
+COMPARED = [
+    ("graph", "p95_ms", False),
+    ("graph", "throughput_tps", True),
+    ("http", "p95_ms", False),
+    ("http", "throughput_tps", True),
+    ("http", "startup_ms", False),
+    ("memory", "bytes_per_session", False),
+]
+
+
+def compare(results, baseline, tolerance):
+    """Print deltas against the baseline; True when nothing regressed beyond tolerance"""
+    ok = True
+    print(f"\n{'metric':<28}{'baseline':>12}{'current':>12}{'change':>10}")
+    for section, key, higher_is_better in COMPARED:
+        old = baseline.get(section, {}).get(key)
+        new = results.get(section, {}).get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        regressed = change < -tolerance if higher_is_better else change > tolerance
+        ok &= not regressed
+        print(
+            f"{section + '.' + key:<28}{old:>12}{new:>12}{change:>+9.0%}"
+            f"{' ❌' if regressed else ''}"
+        )
+    return ok
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Offline latency/throughput/memory benchmark")
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--memory-sessions", type=int, default=200)
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="seconds per fake gpt-4o call")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="seconds per fake query embedding")
+    parser.add_argument("--tool-latency", type=float, default=0.2, help="seconds per fake Tavily search")
+    parser.add_argument("--mcp-latency", type=float, default=0.3, help="seconds per fake GitHub MCP call")
+    parser.add_argument("--save", help="write the results to this JSON baseline")
+    parser.add_argument("--compare", help="compare against this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        install_fakes(args, index_dir)
+        results = {
+            "config": {k: v for k, v in vars(args).items() if k not in ("save", "compare")},
+            "http": await bench_http(args),
+            "graph": await bench_graph(args),
+            "memory": await bench_memory(args),
+        }
+
+    for section in ("http", "graph"):
+        r = results[section]
+        print(
+            f"{section:<6} p50 {r['p50_ms']:>7.1f} ms  p95 {r['p95_ms']:>7.1f} ms  "
+            f"p99 {r['p99_ms']:>7.1f} ms  {r['throughput_tps']:>7.1f} turns/s"
+        )
+    print(f"startup {results['http']['startup_ms']:.1f} ms (ready={results['http']['ready']})")
+    print(f"memory  {results['memory']['bytes_per_session'] / 1024:.1f} KiB per session")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"💾 Baseline saved to {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+# RAG concurrency check: N parallel rag_tool calls should take about as long as one
+#
+#   python benchmarks/rag_concurrency.py [--calls 8] [--latency 0.2] [--max-ratio 1.5]
+#                                        [--mode synthesize|retrieve] [--max-lag 0.05]
+#
+# Stubs each step of a lookup with `--latency` seconds: the query embedding
+# (async, like Voyage), the vector search (blocking, like pymongo; it must run
+# off the event loop) and, in synthesize mode, the gpt-4o-mini call (async).
+# Runs one call, then --calls in parallel with distinct queries (no cache hits)
+# while a heartbeat task measures how long the event loop was blocked. Exits
+# with status 1 when the parallel run takes more than --max-ratio times the
+# single call, or the loop stalls for more than --max-lag seconds.
+# --calls should stay within RAG_MAX_CONCURRENCY (default 8).
+
+import os, sys, time, asyncio, argparse, tempfile
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+os.environ.update(VECTOR_STORE="local", EMBEDDER="hash")
+os.environ.setdefault("RAG_HYBRID", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+
+def install_stubs(args, index_dir):
+    import config
+    import langchain.chat_models
+    import tools.rag as rag
+    from benchmarks.fakes import PROFILE_CHUNKS, ScriptedChatModel, SlowHashEmbeddings
+    from local_index import NumpyVectorStore
+
+    class SlowSearchStore(NumpyVectorStore):
+        def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+            time.sleep(args.latency)  # blocking, like the pymongo $vectorSearch call
+            return super().similarity_search_by_vector(embedding, k=k, **kwargs)
+
+    store = SlowSearchStore(SlowHashEmbeddings(args.latency), index_dir=index_dir, name="rag_concurrency")
+    store.add_texts(PROFILE_CHUNKS, metadatas=[{"source": "profile.pdf", "page": 0}] * len(PROFILE_CHUNKS))
+    config._vector_store = store
+    rag.RAG_MODE = args.mode
+    # get_rag_chain() builds the real retrieval chain around this model
+    langchain.chat_models.init_chat_model = lambda *a, **k: ScriptedChatModel(latency=args.latency)
+    rag._rag_chain = None
+
+
+async def heartbeat(stop, interval=0.01):
+    """Largest delay between scheduled wake-ups, i.e. the longest loop stall"""
+    worst = 0.0
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        worst = max(worst, time.perf_counter() - expected)
+    return worst
+
+
+async def timed(calls):
+    from tools.rag import rag_tool
+
+    stop = asyncio.Event()
+    lag = asyncio.create_task(heartbeat(stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(rag_tool.ainvoke({"query": query}) for query in calls))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    return elapsed, await lag
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Parallel vs single rag_tool latency")
+    parser.add_argument("--calls", type=int, default=8)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per stubbed step")
+    parser.add_argument("--mode", choices=["synthesize", "retrieve"], default="synthesize")
+    parser.add_argument("--max-ratio", type=float, default=1.5)
+    parser.add_argument("--max-lag", type=float, default=0.05)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        install_stubs(args, index_dir)
+        await timed(["warm-up question"])  # build the chain, spin up the search pool
+        single, _ = await timed(["single question"])
+        parallel, lag = await timed([f"parallel question {i}" for i in range(args.calls)])
+
+    ratio = parallel / single
+    ok = ratio <= args.max_ratio and lag <= args.max_lag
+    print(f"mode={args.mode}, {args.latency:.2f}s per step")
+    print(f"1 call:          {single:.2f}s")
+    print(f"{args.calls} parallel calls: {parallel:.2f}s (x{ratio:.2f}, budget x{args.max_ratio:.2f})")
+    print(f"max loop stall:  {lag * 1000:.0f} ms (budget {args.max_lag * 1000:.0f} ms)")
+    print("✅ RAG lookups run concurrently" if ok else "❌ RAG lookups are serialized or block the loop")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
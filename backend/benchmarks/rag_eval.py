@@ -0,0 +1,112 @@
+# Offline retrieval eval: vector-only vs hybrid (BM25 + RRF + MMR + merge)
+#
+#   python benchmarks/rag_eval.py [--embedder hash|voyage] [--budget 300] [-v]
+#
+# Chunks tools/profile.pdf exactly like ingest.py into a throwaway local vector
+# store and BM25 index, then runs a fixed question set through three context
+# builders: the vector top-10 (what RAG_MODE=synthesize stuffs), the vector
+# top RAG_MAX_CHUNKS (RAG_MODE=retrieve) and the hybrid selection. Reports
+# recall (share of gold facts present in the context handed to the model) and
+# the context size in tokens. "hash" needs no API key; "voyage" uses the
+# production embedder (VOYAGE_API_KEY).
+
+import os, sys, argparse, tempfile
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+# (question, facts the answer needs; each must appear in the context)
+QUESTIONS = [
+    ("When is your birthday?", ["30th August 1999"]),
+    ("What is your nickname?", ["Pallove"]),
+    ("Where did you do your master's?", ["University of New South Wales"]),
+    ("What did you score in your bachelor's degree?", ["67%"]),
+    ("Where did you go to primary school?", ["Scholars Rosary"]),
+    ("What's your father's name?", ["Virender Hooda"]),
+    ("Who is Kavya Mohan?", ["favourite friend"]),
+    ("What did you do at Annalect?", ["Annalect India", "OpenAPI"]),
+    ("What did you work on at Stoik?", ["Docker architecture", "MongoDB"]),
+    ("Tell me about the Leave Manager MCP Server", ["FastMCP"]),
+    ("Which project used XGBoost?", ["Sydney Property Sales Predictor"]),
+    ("What certifications do you have?", ["AWS Certified Cloud Practitioner", "FastAPI Development"]),
+    ("What sport do you play?", ["table tennis"]),
+    ("Which frameworks do you know?", ["LangGraph", "FastAPI"]),
+    ("What cloud tools have you used?", ["Bedrock"]),
+]
+
+
+def build_indexes(index_dir, embedder):
+    from config import make_embeddings
+    from ingest import split_pdf
+    from lexical import BM25Index
+    from local_index import NumpyVectorStore
+
+    chunks = split_pdf()
+    ids = sorted(chunks)
+    store = NumpyVectorStore(make_embeddings(embedder), index_dir=index_dir, name="rag_eval")
+    store.add_documents([chunks[cid] for cid in ids], ids=ids)
+    return store, BM25Index.from_documents(ids, [chunks[cid] for cid in ids])
+
+
+def evaluate(name, build_context, verbose):
+    import tools.rag as rag
+
+    found = total = tokens = 0
+    for question, facts in QUESTIONS:
+        context = build_context(question)
+        hits = [fact for fact in facts if fact.lower() in " ".join(context.split()).lower()]
+        found += len(hits)
+        total += len(facts)
+        tokens += rag._tokens(context)
+        if verbose and len(hits) < len(facts):
+            missing = sorted(set(facts) - set(hits))
+            print(f"  {name}: {question!r} missing {missing}")
+    return {"setup": name, "recall": found / total, "avg_context_tokens": tokens / len(QUESTIONS)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Vector-only vs hybrid retrieval eval")
+    parser.add_argument("--embedder", default="hash", choices=["hash", "voyage"])
+    parser.add_argument("--budget", type=int, default=None, help="RAG_CONTEXT_TOKENS for the hybrid setup")
+    parser.add_argument("-v", "--verbose", action="store_true", help="list missed facts")
+    args = parser.parse_args()
+
+    import tools.rag as rag
+
+    with tempfile.TemporaryDirectory() as index_dir:
+        store, lexical = build_indexes(index_dir, args.embedder)
+        rag._lexical["index"] = lexical
+        budget = args.budget or rag.RAG_CONTEXT_TOKENS
+
+        def vector_docs(question):
+            return store.similarity_search(question, k=rag.RETRIEVAL_K)
+
+        def vector_top_k(question):
+            # RAG_MODE=synthesize stuffs every retrieved chunk
+            return rag.format_chunks(vector_docs(question), max_chunks=rag.RETRIEVAL_K)
+
+        def vector_top_chunks(question):
+            # RAG_MODE=retrieve keeps the first RAG_MAX_CHUNKS
+            return rag.format_chunks(vector_docs(question))
+
+        def hybrid(question):
+            lexical_docs = [doc for doc, _ in lexical.search(question, rag.RAG_LEXICAL_K)]
+            scored = rag.rrf([vector_docs(question), lexical_docs])
+            return rag.format_chunks(rag.merge_adjacent(rag.mmr(scored, budget=budget)))
+
+        results = [
+            evaluate(f"vector@{rag.RETRIEVAL_K}", vector_top_k, args.verbose),
+            evaluate(f"vector@{rag.RAG_MAX_CHUNKS}", vector_top_chunks, args.verbose),
+            evaluate("hybrid", hybrid, args.verbose),
+        ]
+
+    print(f"\n{len(QUESTIONS)} questions, embedder={args.embedder}, hybrid budget={budget} tokens")
+    print(f"{'setup':<10}{'recall':>10}{'avg context tokens':>22}")
+    for r in results:
+        print(f"{r['setup']:<10}{r['recall']:>10.0%}{r['avg_context_tokens']:>22.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# Compare RAG_MODE=synthesize vs RAG_MODE=retrieve (needs the real .env credentials)
+#
+#   python benchmarks/rag_modes.py [--runs 3]
+#
+# For each mode every question is sent through the full agent turn
+# (agent -> rag_tool -> agent); latency and OpenAI tokens (nested calls included)
+# are reported per mode. Every call starts with empty caches and the two modes
+# are interleaved question by question, alternating which one goes first.
+
+import os, sys, time, asyncio, argparse, statistics, uuid
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, backend_dir)
+
+from langchain_core.messages import HumanMessage
+from langchain_community.callbacks import get_openai_callback
+from langgraph.checkpoint.memory import InMemorySaver
+
+import tools.rag as rag
+from graph import build_agent, load_tools
+from response_cache import semantic_cache
+from tool_cache import tool_result_cache
+
+QUESTIONS = [
+    "Where did you study?",
+    "What are your skills?",
+    "What's your nickname?",
+    "Tell me about your work experience.",
+    "What projects have you built?",
+]
+
+
+def reset_caches():
+    """Start every measurement cold: no cached embeddings, retrievals, tool results or answers"""
+    rag.embedding_cache.clear()
+    rag.retrieval_cache.clear()
+    tool_result_cache.clear()
+    semantic_cache.clear()
+
+
+async def measure(agent, question, samples):
+    reset_caches()
+    start = time.perf_counter()
+    await rag.rag_tool.ainvoke({"query": question})
+    samples["tool_latencies"].append(time.perf_counter() - start)
+
+    # The direct call above would otherwise warm the caches for the agent turn
+    reset_caches()
+    config = {"configurable": {"thread_id": str(uuid.uuid4())}}
+    with get_openai_callback() as cb:
+        start = time.perf_counter()
+        await agent.ainvoke({"messages": [HumanMessage(content=question)]}, config)
+        samples["latencies"].append(time.perf_counter() - start)
+    samples["tokens"].append(cb.total_tokens)
+
+
+def summarize(mode, samples):
+    return {
+        "mode": mode,
+        "turn_p50_s": statistics.median(samples["latencies"]),
+        "turn_max_s": max(samples["latencies"]),
+        "rag_tool_p50_s": statistics.median(samples["tool_latencies"]),
+        "tokens_per_turn": statistics.mean(samples["tokens"]),
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=1)
+    args = parser.parse_args()
+
+    await load_tools()
+    agent = build_agent(checkpointer=InMemorySaver())
+    modes = ["synthesize", "retrieve"]
+    samples = {mode: {"latencies": [], "tokens": [], "tool_latencies": []} for mode in modes}
+
+    # Alternate which mode goes first so neither one always runs on a colder process
+    for _ in range(args.runs):
+        for question in QUESTIONS:
+            for mode in modes:
+                rag.RAG_MODE = mode
+                await measure(agent, question, samples[mode])
+            modes.reverse()
+
+    results = [summarize(mode, samples[mode]) for mode in ("synthesize", "retrieve")]
+    print(f"{'mode':<12}{'turn p50':>10}{'turn max':>10}{'rag p50':>10}{'tokens':>10}")
+    for r in results:
+        print(
+            f"{r['mode']:<12}{r['turn_p50_s']:>9.2f}s{r['turn_max_s']:>9.2f}s"
+            f"{r['rag_tool_p50_s']:>9.2f}s{r['tokens_per_turn']:>10.0f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
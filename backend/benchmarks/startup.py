@@ -0,0 +1,71 @@
+# Cold import / startup time budget for the backend
+#
+#   python benchmarks/startup.py [--import-budget 3.0] [--startup-budget 15.0]
+#
+# Each measurement runs in a fresh interpreter so nothing is cached. Importing
+# `app` must have no side effects (no MongoDB ping, no PDF parsing, no MCP
+# subprocess); the startup hook does the warm-up concurrently. Exits with
+# status 1 when a budget is exceeded, so it can gate CI.
+
+import os, sys, json, argparse, subprocess
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = """
+import json, time
+t = time.perf_counter()
+import app
+print(json.dumps({"import_s": time.perf_counter() - t}))
+"""
+
+STARTUP_SNIPPET = """
+import json, time
+import app
+from fastapi.testclient import TestClient
+t = time.perf_counter()
+with TestClient(app.app) as client:
+    startup = time.perf_counter() - t
+    health = client.get("/healthz")
+print(json.dumps({"startup_s": startup, "ready": health.status_code == 200}))
+"""
+
+
+def run(snippet):
+    out = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    # The app prints progress lines; the measurement is the last line
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--import-budget", type=float, default=float(os.getenv("IMPORT_BUDGET_S", "3.0")))
+    parser.add_argument("--startup-budget", type=float, default=float(os.getenv("STARTUP_BUDGET_S", "15.0")))
+    parser.add_argument("--skip-startup", action="store_true", help="only measure the import")
+    args = parser.parse_args()
+
+    failed = False
+    result = run(IMPORT_SNIPPET)
+    ok = result["import_s"] <= args.import_budget
+    failed |= not ok
+    print(f"{'✅' if ok else '❌'} import app: {result['import_s']:.2f}s (budget {args.import_budget:.2f}s)")
+
+    if not args.skip_startup:
+        result = run(STARTUP_SNIPPET)
+        ok = result["startup_s"] <= args.startup_budget
+        failed |= not ok
+        print(
+            f"{'✅' if ok else '❌'} startup: {result['startup_s']:.2f}s "
+            f"(budget {args.startup_budget:.2f}s, ready={result['ready']})"
+        )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
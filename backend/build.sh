@@ -10,4 +10,7 @@ pip install --only-binary=all PyYAML
 echo "🔧 Installing remaining dependencies..."
 pip install -r requirements.txt
 
+echo "📚 Ingesting the knowledge base (only changed chunks are embedded)..."
+python ingest.py
+
 echo "✅ Build completed successfully!"
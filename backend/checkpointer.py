@@ -0,0 +1,241 @@
+# CONVERSATION CHECKPOINTER BACKENDS
+#
+# CHECKPOINTER=memory  -> in-process, capped by session count / bytes with LRU eviction
+# CHECKPOINTER=sqlite  -> file-backed, shared by every uvicorn worker on the host,
+#                         idle sessions expire after CHECKPOINT_TTL_SECONDS
+#
+# Both backends run a background sweeper while the app is up.
+
+import os
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+from dotenv import load_dotenv
+from langgraph.checkpoint.memory import InMemorySaver
+
+load_dotenv()
+
+CHECKPOINTER = os.getenv("CHECKPOINTER", "memory").lower()
+MAX_SESSIONS = int(os.getenv("CHECKPOINT_MAX_SESSIONS", "1000"))
+MAX_BYTES = int(os.getenv("CHECKPOINT_MAX_BYTES", str(256 * 1024 * 1024)))
+TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", str(24 * 60 * 60)))
+SWEEP_INTERVAL = float(os.getenv("CHECKPOINT_SWEEP_INTERVAL", "60"))
+DB_PATH = os.getenv(
+    "CHECKPOINT_DB_PATH", str(Path(__file__).parent / "checkpoints.sqlite")
+)
+
+
+def _nbytes(obj):
+    """Approximate size of serialized checkpoint data (sums nested bytes payloads)"""
+    if isinstance(obj, (bytes, bytearray)):
+        return len(obj)
+    if isinstance(obj, (tuple, list)):
+        return sum(_nbytes(o) for o in obj)
+    if isinstance(obj, dict):
+        return sum(_nbytes(o) for o in obj.values())
+    return 0
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """InMemorySaver capped by session count and bytes, evicting least recently used threads"""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, max_bytes=MAX_BYTES, ttl=TTL_SECONDS):
+        super().__init__()
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        # thread_id -> [last_seen, approx_bytes], ordered from least to most recently used
+        self._sessions = OrderedDict()
+        self._total_bytes = 0
+        self.evictions = 0
+
+    def _touch(self, thread_id, added_bytes=0):
+        entry = self._sessions.pop(thread_id, None) or [0.0, 0]
+        entry[0] = time.monotonic()
+        entry[1] += added_bytes
+        self._total_bytes += added_bytes
+        self._sessions[thread_id] = entry
+
+    def _evict(self, thread_id):
+        entry = self._sessions.pop(thread_id, None)
+        if entry:
+            self._total_bytes -= entry[1]
+        self.delete_thread(thread_id)
+        self.evictions += 1
+
+    def _enforce_limits(self, keep=None):
+        while self._sessions and (
+            len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._sessions))
+            if oldest == keep:
+                # Never evict the session that is currently being written
+                if len(self._sessions) == 1:
+                    break
+                self._sessions.move_to_end(oldest)
+                oldest = next(iter(self._sessions))
+            self._evict(oldest)
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"].get("thread_id")
+        if thread_id in self._sessions:
+            self._touch(thread_id)
+        return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        result = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = config["configurable"]["thread_id"]
+        ns = config["configurable"].get("checkpoint_ns", "")
+        added = _nbytes(self.storage[thread_id][ns].get(checkpoint["id"]))
+        added += sum(
+            _nbytes(self.blobs.get((thread_id, ns, k, v))) for k, v in new_versions.items()
+        )
+        self._touch(thread_id, added)
+        self._enforce_limits(keep=thread_id)
+        return result
+
+    async def sweep(self):
+        """Drop sessions idle for longer than the TTL and re-apply the caps"""
+        if self.ttl > 0:
+            cutoff = time.monotonic() - self.ttl
+            for thread_id, (last_seen, _) in list(self._sessions.items()):
+                if last_seen >= cutoff:
+                    break  # ordered by recency, the rest are newer
+                self._evict(thread_id)
+        self._enforce_limits()
+
+    async def stats(self):
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "bytes": self._total_bytes,
+            "evictions": self.evictions,
+        }
+
+
+def _sqlite_saver_class():
+    # Optional dependency: only needed when CHECKPOINTER=sqlite
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    class TTLSqliteSaver(AsyncSqliteSaver):
+        """AsyncSqliteSaver that records session activity and expires idle threads"""
+
+        ttl = TTL_SECONDS
+        # Skip rewriting the activity row more often than this (seconds)
+        touch_interval = 30.0
+
+        async def setup(self):
+            if self.is_setup:
+                return
+            await super().setup()
+            async with self.lock:
+                await self.conn.execute(
+                    "CREATE TABLE IF NOT EXISTS session_activity "
+                    "(thread_id TEXT PRIMARY KEY, last_seen REAL NOT NULL)"
+                )
+                await self.conn.commit()
+            self._touched = {}
+            self.evictions = 0
+
+        async def _touch(self, thread_id):
+            now = time.time()
+            if now - self._touched.get(thread_id, 0.0) < self.touch_interval:
+                return
+            self._touched[thread_id] = now
+            async with self.lock:
+                await self.conn.execute(
+                    "INSERT INTO session_activity (thread_id, last_seen) VALUES (?, ?) "
+                    "ON CONFLICT(thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+                    (str(thread_id), now),
+                )
+                await self.conn.commit()
+
+        async def aget_tuple(self, config):
+            await self.setup()
+            thread_id = config["configurable"].get("thread_id")
+            if thread_id is not None:
+                await self._touch(thread_id)
+            return await super().aget_tuple(config)
+
+        async def aput(self, config, checkpoint, metadata, new_versions):
+            result = await super().aput(config, checkpoint, metadata, new_versions)
+            await self._touch(config["configurable"]["thread_id"])
+            return result
+
+        async def sweep(self):
+            """Delete threads idle for longer than the TTL (safe to run from every worker)"""
+            await self.setup()
+            if self.ttl <= 0:
+                return
+            cutoff = time.time() - self.ttl
+            async with self.conn.execute(
+                "SELECT thread_id FROM session_activity WHERE last_seen < ?", (cutoff,)
+            ) as cur:
+                expired = [row[0] for row in await cur.fetchall()]
+            for thread_id in expired:
+                await self.adelete_thread(thread_id)
+                async with self.lock:
+                    await self.conn.execute(
+                        "DELETE FROM session_activity WHERE thread_id = ? AND last_seen < ?",
+                        (thread_id, cutoff),
+                    )
+                    await self.conn.commit()
+                self._touched.pop(thread_id, None)
+                self.evictions += 1
+
+        async def stats(self):
+            await self.setup()
+            async with self.conn.execute("SELECT COUNT(*) FROM session_activity") as cur:
+                (sessions,) = await cur.fetchone()
+            return {"backend": "sqlite", "sessions": sessions, "evictions": self.evictions}
+
+    return TTLSqliteSaver
+
+
+async def _sweep_forever(saver, interval):
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await saver.sweep()
+        except Exception as e:
+            print(f"⚠️ Checkpoint sweep failed: {e}")
+
+
+@asynccontextmanager
+async def open_checkpointer(backend=CHECKPOINTER):
+    """Create the configured checkpointer and run its background sweeper"""
+    conn = None
+    if backend == "sqlite":
+        import aiosqlite
+
+        conn = await aiosqlite.connect(DB_PATH)
+        try:
+            # WAL + busy timeout let several uvicorn workers share the same file
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+            saver = _sqlite_saver_class()(conn)
+            await saver.setup()
+        except BaseException:
+            # aiosqlite's worker thread is non-daemon: an open connection hangs exit
+            await conn.close()
+            raise
+    elif backend == "memory":
+        saver = BoundedMemorySaver()
+    else:
+        raise ValueError(f"Unknown CHECKPOINTER backend: {backend!r}")
+
+    sweeper = asyncio.create_task(_sweep_forever(saver, SWEEP_INTERVAL))
+    print(f"✅ Checkpointer ready: {backend}")
+    try:
+        yield saver
+    finally:
+        sweeper.cancel()
+        try:
+            await sweeper
+        except asyncio.CancelledError:
+            pass
+        if conn is not None:
+            await conn.close()
@@ -0,0 +1,140 @@
+# COMPACT TOOL OUTPUTS BEFORE THEY ENTER THE MESSAGE HISTORY
+#
+# Tool results become ToolMessages that are re-sent to gpt-4o on every later
+# turn, so each tool's output is reduced to the fields the model needs and
+# capped at a token budget with deterministic truncation. One layer of the
+# tool pipeline (tool_pipeline.py).
+
+import os
+import json
+
+from telemetry import get_logger
+
+log = get_logger("compact")
+
+TOOL_OUTPUT_MAX_TOKENS = int(os.getenv("TOOL_OUTPUT_MAX_TOKENS", "800"))
+SNIPPET_CHARS = int(os.getenv("TOOL_OUTPUT_SNIPPET_CHARS", "300"))
+
+# Fields kept per result item, in output order: (output name, source keys)
+TOOL_OUTPUT_FIELDS = {
+    "web_search_tool": [
+        ("title", ["title"]),
+        ("url", ["url"]),
+        ("snippet", ["content", "snippet"]),
+    ],
+    "search_repositories": [
+        ("name", ["full_name", "name"]),
+        ("description", ["description"]),
+        ("stars", ["stargazers_count"]),
+        ("language", ["language"]),
+        ("url", ["html_url"]),
+    ],
+}
+
+# Per-tool token caps (everything else uses TOOL_OUTPUT_MAX_TOKENS)
+TOOL_OUTPUT_TOKENS = {
+    "now_tool": 50,
+}
+
+compaction_stats = {}  # tool name -> {"calls", "tokens_in", "tokens_out", "truncated"}
+
+
+def _tokens(text):
+    # Same ~4 chars/token estimate as count_tokens_approximately in history.py
+    return -(-len(text) // 4)
+
+
+def truncate(text, max_tokens):
+    """Cut to roughly max_tokens at a line (or word) boundary; same input, same output"""
+    if _tokens(text) <= max_tokens:
+        return text
+    limit = max_tokens * 4
+    cut = text.rfind("\n", 0, limit)
+    if cut < limit // 2:
+        cut = text.rfind(" ", 0, limit)
+    if cut < limit // 2:
+        cut = limit
+    return text[:cut].rstrip() + f"\n…[truncated {len(text) - cut} chars]"
+
+
+def _pick(item, fields):
+    picked = {}
+    for out_name, keys in fields:
+        for key in keys:
+            value = item.get(key)
+            if value not in (None, ""):
+                if isinstance(value, str):
+                    value = " ".join(value.split())
+                    if len(value) > SNIPPET_CHARS:
+                        value = value[:SNIPPET_CHARS].rstrip() + "…"
+                picked[out_name] = value
+                break
+    return picked
+
+
+def _as_items(output):
+    """Result items from a list, a {"results"/"items": [...]} dict or a JSON string"""
+    if isinstance(output, list) and len(output) == 1 and isinstance(output[0], str):
+        output = output[0]
+    if isinstance(output, str):
+        try:
+            output = json.loads(output)
+        except ValueError:
+            return None
+    if isinstance(output, dict):
+        output = output.get("results", output.get("items"))
+    if isinstance(output, list) and all(isinstance(i, dict) for i in output):
+        return output
+    return None
+
+
+def compact_output(name, output):
+    """Compacted string form of one tool result"""
+    fields = TOOL_OUTPUT_FIELDS.get(name)
+    items = _as_items(output) if fields else None
+    if items is not None:
+        lines = []
+        for item in items:
+            picked = _pick(item, fields)
+            if picked:
+                lines.append(" | ".join(f"{k}: {v}" for k, v in picked.items()))
+        text = "\n".join(lines) or "No results."
+    elif isinstance(output, str):
+        text = output
+    else:
+        text = json.dumps(output, default=str, ensure_ascii=False)
+    return truncate(text, TOOL_OUTPUT_TOKENS.get(name, TOOL_OUTPUT_MAX_TOKENS))
+
+
+def with_compaction(name, call):
+    """`call` whose output is compacted and logged"""
+
+    async def compacted_call(**kwargs):
+        output = await call(**kwargs)
+        compacted = compact_output(name, output)
+        raw = output if isinstance(output, str) else json.dumps(output, default=str)
+        before, after = _tokens(raw), _tokens(compacted)
+        stats = compaction_stats.setdefault(
+            name, {"calls": 0, "tokens_in": 0, "tokens_out": 0, "truncated": 0}
+        )
+        stats["calls"] += 1
+        stats["tokens_in"] += before
+        stats["tokens_out"] += after
+        stats["truncated"] += "…[truncated " in compacted
+        log.info("✂️ %s output: ~%d → ~%d tokens", name, before, after)
+        return compacted
+
+    return compacted_call
+
+
+def get_compaction_stats():
+    return {
+        "max_tokens": TOOL_OUTPUT_MAX_TOKENS,
+        "tools": {
+            name: {
+                **s,
+                "saved_ratio": round(1 - s["tokens_out"] / s["tokens_in"], 3) if s["tokens_in"] else 0.0,
+            }
+            for name, s in compaction_stats.items()
+        },
+    }
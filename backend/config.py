@@ -1,30 +1,189 @@
-from pymongo import MongoClient
-from langchain_voyageai import VoyageAIEmbeddings
-from langchain_mongodb import MongoDBAtlasVectorSearch
 from dotenv import load_dotenv
 import os
+import threading
 
 load_dotenv()
 
-URI = os.environ["URI"]
+# VECTOR_STORE=atlas (MongoDB Atlas $vectorSearch) or local (NumPy index in tools/)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "atlas").lower()
+# EMBEDDER=voyage (voyage-3-large) or hash (deterministic, offline)
+EMBEDDER = os.getenv("EMBEDDER", "voyage").lower()
+
+URI = os.getenv("URI")
 db_name = os.getenv("DB_NAME")
 collections = os.getenv("MONGODB_COLLECTION")
 vector_index = os.getenv("ATLAS_VECTOR_SEARCH_INDEX_NAME")
 
-# Create a new client and connect to the server
-client = MongoClient(URI)
+# One app-owned MongoDB pool shared by retrieval, ingestion and the ping
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "2"))
+MONGO_MAX_IDLE_MS = int(os.getenv("MONGO_MAX_IDLE_MS", "300000"))
+MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", "5000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", "10000"))
+# zstd/snappy need the zstandard/python-snappy packages; zlib is built in
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zlib")
+# Run $vectorSearch on pymongo's native async client instead of a thread pool
+MONGO_ASYNC = os.getenv("MONGO_ASYNC", "true").lower() == "true"
+
+# Created on first use (or by the app's startup hook), never at import time
+_client = None
+_async_client = None
+_vector_store = None
+# The startup warm-ups create these from worker threads at the same time
+_client_lock = threading.Lock()
+_vector_store_lock = threading.Lock()
+
+
+def make_embeddings(name=EMBEDDER):
+    if name == "voyage":
+        from langchain_voyageai import VoyageAIEmbeddings
+
+        return VoyageAIEmbeddings(model="voyage-3-large")
+    if name == "hash":
+        from local_index import HashEmbeddings
+
+        return HashEmbeddings()
+    raise ValueError(f"Unknown EMBEDDER: {name!r}")
+
+
+def client_options():
+    """Pool, timeout and compression settings shared by the sync and async clients"""
+    options = {
+        "appname": "aayushbot",
+        "maxPoolSize": MONGO_MAX_POOL_SIZE,
+        "minPoolSize": MONGO_MIN_POOL_SIZE,
+        "maxIdleTimeMS": MONGO_MAX_IDLE_MS,
+        "connectTimeoutMS": MONGO_CONNECT_TIMEOUT_MS,
+        "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        "socketTimeoutMS": MONGO_SOCKET_TIMEOUT_MS,
+        "retryReads": True,
+    }
+    if MONGO_COMPRESSORS:
+        options["compressors"] = MONGO_COMPRESSORS
+    return options
+
+
+def get_client():
+    """Shared sync MongoDB client (atlas backend only)"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                from pymongo import MongoClient
+
+                if not URI:
+                    raise RuntimeError("URI must be set when VECTOR_STORE=atlas")
+                _client = MongoClient(URI, **client_options())
+    return _client
+
+
+def get_async_client():
+    """Shared async MongoDB client for the request hot path, or None if unavailable"""
+    global _async_client
+    if _async_client is None and MONGO_ASYNC and VECTOR_STORE == "atlas":
+        try:
+            from pymongo import AsyncMongoClient
+        except ImportError:  # pymongo < 4.10
+            return None
+        if not URI:
+            raise RuntimeError("URI must be set when VECTOR_STORE=atlas")
+        _async_client = AsyncMongoClient(URI, **client_options())
+    return _async_client
+
+
+def get_async_collection():
+    client = get_async_client()
+    return client[db_name][collections] if client is not None else None
+
+
+async def close_clients():
+    """Close the shared MongoDB clients (app shutdown)"""
+    global _client, _async_client, _vector_store
+    if _async_client is not None:
+        await _async_client.close()
+        _async_client = None
+    if _client is not None:
+        _client.close()
+        _client = None
+        if VECTOR_STORE == "atlas":
+            _vector_store = None
+
+
+def pool_stats():
+    """Connection pool settings and whether each client is open"""
+    if VECTOR_STORE != "atlas":
+        return None
+    return {
+        "sync_open": _client is not None,
+        "async_open": _async_client is not None,
+        "max_pool_size": MONGO_MAX_POOL_SIZE,
+        "min_pool_size": MONGO_MIN_POOL_SIZE,
+        "compressors": MONGO_COMPRESSORS,
+    }
+
+
+def ping_mongo():
+    """Send a ping to confirm a successful connection"""
+    if VECTOR_STORE != "atlas":
+        # Local vector store: nothing to connect to
+        return True
+    try:
+        get_client().admin.command("ping")
+        print("Pinged your deployment. You successfully connected to MongoDB!")
+        return True
+    except Exception as e:
+        print(e)
+        return False
+
+
+async def aping_mongo():
+    """Ping through the async client so its pool is connected before the first request"""
+    if VECTOR_STORE != "atlas":
+        return True
+    try:
+        client = get_async_client()
+        if client is not None:
+            await client.admin.command("ping")
+        return True
+    except Exception as e:
+        print(e)
+        return False
+
+
+def get_vector_store():
+    global _vector_store
+    if _vector_store is not None:
+        return _vector_store
+    with _vector_store_lock:
+        if _vector_store is None:
+            _vector_store = _make_vector_store()
+    return _vector_store
+
+
+def reload_vector_store():
+    """Pick up an index another process re-ingested (local store; Atlas is always live)"""
+    store = _vector_store
+    if store is not None and hasattr(store, "reload") and store.reload():
+        print(f"✅ Local vector index reloaded: {len(store)} vectors")
+
 
-# Send a ping to confirm a successful connection
-try:
-    client.admin.command("ping")
-    print("Pinged your deployment. You successfully connected to MongoDB!")
-except Exception as e:
-    print(e)
+def _make_vector_store():
+    if VECTOR_STORE == "atlas":
+        from langchain_mongodb import MongoDBAtlasVectorSearch
 
+        # Reuse the shared pool instead of a second client from the connection string
+        return MongoDBAtlasVectorSearch(
+            collection=get_client()[db_name][collections],
+            embedding=make_embeddings(),
+            index_name=vector_index,
+        )
+    if VECTOR_STORE == "local":
+        from local_index import NumpyVectorStore
 
-vector_store = MongoDBAtlasVectorSearch.from_connection_string(
-    connection_string=URI,
-    namespace=f"{db_name}.{collections}",  # database.collection
-    embedding=VoyageAIEmbeddings(model="voyage-3-large"),
-    index_name=vector_index,
-)
+        store = NumpyVectorStore(make_embeddings())
+        print(f"✅ Local vector index loaded: {len(store)} vectors")
+        if store.is_empty():
+            print("⚠️ Local vector index is empty - run `python ingest.py`")
+        return store
+    raise ValueError(f"Unknown VECTOR_STORE: {VECTOR_STORE!r}")
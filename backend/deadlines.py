@@ -0,0 +1,127 @@
+# TOOL DEADLINES AND PARTIAL RESULTS
+#
+# Every tool call gets a deadline: its TOOL_TIMEOUTS entry (TOOL_TIMEOUT for
+# tools not listed, e.g. the GitHub MCP tools), cut short by whatever is left
+# of the turn's TURN_TIMEOUT budget (graph.py sets `turn_deadline` for the
+# tools node). A call that runs late is cancelled. Late and failed calls do not
+# raise: each returns an error ToolMessage (status="error") with a JSON body
+# the agent can read. The other calls of the same step keep their results, and
+# the agent answers with what it has. Outermost layer of the tool pipeline
+# (tool_pipeline.py), so cache waits and upstream queueing count too.
+#
+# Sync tools (web_search_tool) run in a worker thread that cannot be stopped;
+# the turn stops waiting for them and their result is dropped.
+
+import os
+import json
+import time
+import asyncio
+import contextvars
+
+from dotenv import load_dotenv
+from langchain_core.tools import ToolException
+
+from telemetry import get_logger
+
+load_dotenv()
+
+log = get_logger("deadlines")
+
+# Seconds per tool call
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", "15"))
+TOOL_TIMEOUTS = {
+    "now_tool": float(os.getenv("TOOL_TIMEOUT_NOW", "2")),
+    "rag_tool": float(os.getenv("TOOL_TIMEOUT_RAG", "20")),
+    "web_search_tool": float(os.getenv("TOOL_TIMEOUT_WEB_SEARCH", "10")),
+}
+# Seconds from the user's message until tool calls stop being started or awaited
+TURN_TIMEOUT = float(os.getenv("TURN_TIMEOUT", "45"))
+
+# time.monotonic() after which tool calls of this turn are cut off
+turn_deadline = contextvars.ContextVar("turn_deadline", default=None)
+tool_stats = {}  # tool name -> {"calls", "timeouts", "errors"}
+
+
+def _record(name, outcome):
+    stats = tool_stats.setdefault(name, {"calls": 0, "timeouts": 0, "errors": 0})
+    stats["calls"] += 1
+    if outcome != "ok":
+        stats[outcome + "s"] += 1
+        _metric(name, outcome)
+
+
+def _metric(name, outcome):
+    from telemetry import get_metrics
+
+    metrics = get_metrics()
+    if metrics is not None:
+        metrics["tool_failures"].labels(name, outcome).inc()
+
+
+def tool_error(name, status, message, elapsed):
+    """ToolException whose text is the JSON the agent sees in the ToolMessage"""
+    return ToolException(
+        json.dumps(
+            {
+                "status": status,
+                "tool": name,
+                "elapsed_s": round(elapsed, 2),
+                "message": message,
+            }
+        )
+    )
+
+
+def with_deadline(name, call):
+    """`call` with a deadline; late or failed calls raise tool_error()"""
+    limit = TOOL_TIMEOUTS.get(name, TOOL_TIMEOUT)
+
+    async def bounded(**kwargs):
+        timeout, status = limit, "timeout"
+        deadline = turn_deadline.get()
+        if deadline is not None and deadline - time.monotonic() < timeout:
+            timeout, status = max(0.0, deadline - time.monotonic()), "turn_timeout"
+        started = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(call(**kwargs), timeout)
+        except asyncio.TimeoutError:
+            elapsed = time.perf_counter() - started
+            _record(name, "timeout")
+            log.warning("⏰ %s cut off after %.1fs (%s)", name, elapsed, status)
+            raise tool_error(
+                name,
+                status,
+                f"{name} did not finish in time and was cancelled. Answer with the "
+                "other results you have, or tell the user this source is unavailable right now.",
+                elapsed,
+            ) from None
+        except Exception as e:
+            elapsed = time.perf_counter() - started
+            _record(name, "error")
+            log.warning("❌ %s failed after %.1fs: %s", name, elapsed, e)
+            raise tool_error(
+                name,
+                "error",
+                f"{name} failed ({type(e).__name__}: {e}). Answer with the other "
+                "results you have, or tell the user this source is unavailable right now.",
+                elapsed,
+            ) from None
+        _record(name, "ok")
+        return result
+
+    return bounded
+
+
+def get_deadline_stats():
+    return {
+        "tool_timeout_s": TOOL_TIMEOUT,
+        "turn_timeout_s": TURN_TIMEOUT,
+        "tools": {
+            name: {
+                **s,
+                "timeout_rate": round(s["timeouts"] / s["calls"], 3) if s["calls"] else 0.0,
+                "error_rate": round(s["errors"] / s["calls"], 3) if s["calls"] else 0.0,
+            }
+            for name, s in tool_stats.items()
+        },
+    }
@@ -6,29 +6,38 @@ from zoneinfo import ZoneInfo
 from typing import Annotated, TypedDict
 from langgraph.graph import StateGraph, START, END
 from langgraph.graph.message import add_messages
-from langchain.chat_models import init_chat_model
 from dotenv import load_dotenv
 
 from langgraph.prebuilt import ToolNode, tools_condition
 import asyncio
+import time
+import logging
 from langgraph.types import Command, interrupt
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage
 from tools.web import web_search_tool
-from tools.rag import rag_tool
+from tools.rag import rag_tool, start_prefetch, active_prefetch
+from langchain_core.runnables import RunnableConfig
 from tools.prompt import system_prompt
+from history import apply_history_policy
+from langchain_core.messages.utils import count_tokens_approximately
 
-# MCP import moved to lazy initialization
 from langchain_core.tools import tool
-import asyncio
+from tools.github_mcp import get_mcp_tools
+from tool_pipeline import wrap_tools
+from admission import upstream
+from deadlines import TURN_TIMEOUT, turn_deadline
+import router
+from telemetry import get_logger
 
 load_dotenv()
 
+log = get_logger("graph")
 
-# Import MCP tools lazily to avoid event loop issues
-from tools.github_mcp import get_mcp_tools
-
-# Initialize MCP tools
-mcp_tools, username = get_mcp_tools()
+# GitHub MCP tools are loaded by load_tools() in the app's startup hook
+mcp_tools = []
+username = os.getenv("GITHUB_USERNAME")
+# Routes agent calls to the same OpenAI cache shard; "" disables
+PROMPT_CACHE_KEY = os.getenv("PROMPT_CACHE_KEY", "aayushbot-agent")
 
 
 # utility tools
@@ -41,126 +50,235 @@ def now_tool(tz: str = "Australia/Sydney") -> str:
     return datetime.now(ZoneInfo(tz)).strftime("%Y-%m-%d %H:%M:%S %Z")
 
 
-llm = init_chat_model("openai:gpt-4o")
-
-
 class AgentState(TypedDict):
     messages: Annotated[list, add_messages]
-
-
-TOOLS = [web_search_tool, rag_tool, now_tool] + mcp_tools
-tool_node = ToolNode(TOOLS)
-
-
-async def debug_tool_node(state: AgentState) -> dict:
-    """Debug wrapper around tool execution with MCP username injection"""
-    print("🔧 Executing tools...")
-
-    # Check if any MCP tools are being called
+    # Rolling summary of turns folded out of `messages` (see history.py)
+    summary: str
+    # time.time() of the user message the current turn started with (deadlines.py)
+    turn_started: float
+
+
+BASE_TOOLS = [web_search_tool, rag_tool, now_tool]
+# Updated in place by load_tools() so importers see the MCP tools too.
+# Each tool runs through tool_pipeline.py: upstream slot, compaction, cache,
+# and a deadline that turns late or failed calls into error ToolMessages.
+TOOLS = wrap_tools(BASE_TOOLS)
+
+# Built by build_agent() once the tool list is final
+tool_node = None
+policy_llm = None
+
+# RAG prefetch started by agent_node, waiting for the tools node (by thread_id).
+# A turn that dies in between leaves its entry behind: the thread's next turn
+# discards it, and entries older than the turn budget are pruned.
+pending_prefetches = {}
+
+# PROMPT PREFIX
+#
+# Every agent call starts with the same bytes: the tool definitions (bound once,
+# sorted by name so MCP discovery order can't reorder them) and the system
+# prompt. Neither lives in the checkpointed state, so the provider's prompt
+# cache can reuse the prefix; the summary and history follow it.
+STATIC_PREFIX = [system_prompt]
+PREFIX_TOKENS = count_tokens_approximately(STATIC_PREFIX)
+prompt_cache_stats = {"calls": 0, "input_tokens": 0, "cached_tokens": 0}
+
+
+def record_usage(usage):
+    """Add one call's input / cached input tokens (usage_metadata) to the stats"""
+    input_tokens = usage.get("input_tokens") or 0
+    cached = (usage.get("input_token_details") or {}).get("cache_read") or 0
+    prompt_cache_stats["calls"] += 1
+    prompt_cache_stats["input_tokens"] += input_tokens
+    prompt_cache_stats["cached_tokens"] += cached
+    return input_tokens, cached
+
+
+def get_prompt_cache_stats():
+    s = prompt_cache_stats
+    return {
+        **s,
+        "prefix_tokens": PREFIX_TOKENS,
+        "cached_ratio": round(s["cached_tokens"] / s["input_tokens"], 3) if s["input_tokens"] else 0.0,
+    }
+
+
+async def load_tools():
+    """Start the GitHub MCP server and register its tools"""
+    global mcp_tools, username
+    mcp_tools, username = await get_mcp_tools()
+    TOOLS[:] = wrap_tools(BASE_TOOLS + mcp_tools)
+    return TOOLS
+
+
+async def debug_tool_node(state: AgentState, config: RunnableConfig) -> dict:
+    """Tool execution with MCP username injection"""
     messages = state.get("messages", [])
     last_message = messages[-1] if messages else None
 
-    # Check if the last message has tool calls
     if hasattr(last_message, "tool_calls") and last_message.tool_calls:
-        print(
-            f"🔧 Tool calls detected: {[tc.get('name', 'unknown') for tc in last_message.tool_calls]}"
+        log.info(
+            "🔧 Executing tools: %s", [tc.get("name", "unknown") for tc in last_message.tool_calls]
         )
 
-        # Print tool calls BEFORE username injection
-        print("\n📋 TOOL CALLS BEFORE USERNAME INJECTION:")
-        for i, tool_call in enumerate(last_message.tool_calls):
-            print(f"  Tool {i+1}: {tool_call.get('name', 'unknown')}")
-            print(f"    Args: {tool_call.get('args', {})}")
-
-        # Check if any of the tool calls are MCP tools
-        mcp_tool_calls = []
+        # MCP tools get the configured GitHub username injected into their args
+        mcp_names = {mcp_tool.name for mcp_tool in mcp_tools}
         for tool_call in last_message.tool_calls:
-            tool_name = tool_call.get("name", "")
-            # Check if this is an MCP tool by checking if it's in our MCP tools list
-            if any(tool_name == mcp_tool.name for mcp_tool in mcp_tools):
-                mcp_tool_calls.append(tool_call)
-                print(f"🎯 MCP tool detected: {tool_name}")
-
-        # If MCP tools are being called, inject username into the tool call arguments
-        if mcp_tool_calls:
-            print(f"\n📝 Injecting username '{username}' into MCP tool calls")
-            for tool_call in mcp_tool_calls:
-                if "args" not in tool_call:
-                    tool_call["args"] = {}
-                tool_call["args"]["username"] = username
-                print(f"✅ Username added to {tool_call.get('name')} tool call")
-
-        # Print tool calls AFTER username injection
-        print("\n📋 TOOL CALLS AFTER USERNAME INJECTION:")
-        for i, tool_call in enumerate(last_message.tool_calls):
-            print(f"  Tool {i+1}: {tool_call.get('name', 'unknown')}")
-            print(f"    Args: {tool_call.get('args', {})}")
-            if "username" in tool_call.get("args", {}):
-                print(f"    🎯 Username: {tool_call['args']['username']}")
-
-    # Use async invoke for MCP tools
-    result = await tool_node.ainvoke(state)
-    print(
-        f"\n✅ Tool execution completed. Results: {len(result.get('messages', []))} messages"
-    )
+            if tool_call.get("name", "") in mcp_names:
+                tool_call.setdefault("args", {})["username"] = username
+                log.debug("🎯 Username %r added to %s tool call", username, tool_call.get("name"))
+
+        if log.isEnabledFor(logging.DEBUG):
+            for i, tool_call in enumerate(last_message.tool_calls):
+                log.debug("  Tool %d: %s args=%s", i + 1, tool_call.get("name"), tool_call.get("args", {}))
+
+    # Use async invoke for MCP tools; rag_tool can reuse this turn's prefetch
+    thread_id = config["configurable"].get("thread_id")
+    prefetch = pending_prefetches.pop(thread_id, None)
+    token = active_prefetch.set(prefetch)
+    # Tool calls must finish within what is left of the turn budget
+    left = state.get("turn_started", time.time()) + TURN_TIMEOUT - time.time()
+    deadline_token = turn_deadline.set(time.monotonic() + left)
+    try:
+        result = await tool_node.ainvoke(state)
+    finally:
+        turn_deadline.reset(deadline_token)
+        active_prefetch.reset(token)
+        if prefetch is not None:
+            prefetch.discard()
+    log.debug("✅ Tool execution completed: %d messages", len(result.get("messages", [])))
     return result
 
 
-policy_llm = llm.bind_tools(TOOLS)
-
 graph = StateGraph(AgentState)
 
 
-async def agent_node(state: AgentState) -> dict:
-    # Ensure system prompt is always included
-    messages = state["messages"]
-    if not any(
-        isinstance(msg, type(system_prompt)) and msg.content == system_prompt.content
-        for msg in messages
-    ):
-        messages = [system_prompt] + messages
+async def router_node(state: AgentState) -> dict:
+    """Fast path for trivial intents (see router.py); empty update falls through"""
+    reply = await router.route(state["messages"], {t.name: t for t in TOOLS})
+    return {"messages": reply} if reply else {}
+
+
+def route_after_router(state: AgentState) -> str:
+    return END if isinstance(state["messages"][-1], AIMessage) else "agent"
+
+
+async def agent_node(state: AgentState, config: RunnableConfig) -> dict:
+    history = state["messages"]
+    # Threads started before the prompt moved out of the state carry it first
+    if history and history[0].type == "system" and history[0].content == system_prompt.content:
+        history = history[1:]
+
+    # Summarize / drop stale tool results / trim to the token budget
+    full_tokens = PREFIX_TOKENS + count_tokens_approximately(history)
+    history, update = await apply_history_policy(history, state.get("summary", ""))
+    messages = STATIC_PREFIX + history
+    sent_tokens = PREFIX_TOKENS + count_tokens_approximately(history)
+
+    log.debug("🤖 Agent processing: %s", messages[-1].content)
+    thread_id = config["configurable"].get("thread_id")
+    # First step of a turn: start the turn clock, speculatively retrieve for the user's message
+    prefetch = None
+    turn = {}
+    if isinstance(messages[-1], HumanMessage):
+        turn["turn_started"] = time.time()
+        _discard_prefetch(thread_id)
+        prefetch = start_prefetch(messages[-1].content)
+    started = time.perf_counter()
+    try:
+        async with upstream("openai"):
+            result = await policy_llm.ainvoke(messages)
+    except BaseException:
+        if prefetch is not None:
+            prefetch.discard()
+        raise
+    router.record_llm_call((time.perf_counter() - started) * 1000)
+    if prefetch is not None:
+        if any(tc["name"] == "rag_tool" for tc in result.tool_calls):
+            _park_prefetch(thread_id, prefetch)
+        else:
+            prefetch.discard()
+
+    usage = getattr(result, "usage_metadata", None) or {}
+    input_tokens, cached = record_usage(usage)
+    log.info(
+        "🧮 Prompt tokens: full history ~%d, sent ~%d, billed %s (%d cached)",
+        full_tokens, sent_tokens, input_tokens or "n/a", cached,
+    )
+    if result.tool_calls:
+        log.debug("🔧 Agent wants to call tools: %s", [tc["name"] for tc in result.tool_calls])
+    else:
+        log.debug("💭 Agent responded without calling tools")
 
-    print(f"🤖 Agent processing: {messages[-1].content}")
-    result = await policy_llm.ainvoke(messages)
+    if update:
+        return {**turn, "summary": update["summary"], "messages": update["messages"] + [result]}
+    return {**turn, "messages": [result]}
 
-    # Debug: Check if the agent wants to call tools
-    if hasattr(result, "tool_calls") and result.tool_calls:
-        print(
-            f"🔧 Agent wants to call tools: {[tc.get('name', 'unknown') for tc in result.tool_calls]}"
-        )
-    else:
-        print("💭 Agent responded without calling tools")
 
-    return {"messages": [result]}
+def _discard_prefetch(thread_id):
+    prefetch = pending_prefetches.pop(thread_id, None)
+    if prefetch is not None:
+        prefetch.discard()
 
 
+def _park_prefetch(thread_id, prefetch):
+    """Hand a prefetch to this turn's tools node, pruning ones no turn came back for"""
+    cutoff = time.perf_counter() - TURN_TIMEOUT
+    for stale in [t for t, p in pending_prefetches.items() if p.started < cutoff]:
+        _discard_prefetch(stale)
+    pending_prefetches[thread_id] = prefetch
+
+
+graph.add_node("router", router_node)
 graph.add_node("agent", agent_node)
 graph.add_node("tools", debug_tool_node)
 
-graph.set_entry_point("agent")
+graph.set_entry_point("router")
+graph.add_conditional_edges("router", route_after_router, ["agent", END])
 graph.add_conditional_edges("agent", tools_condition)
 graph.add_edge("tools", "agent")
 
-from langgraph.checkpoint.memory import InMemorySaver
 
-memory = InMemorySaver()
-agent = graph.compile(checkpointer=memory)
+def build_agent(checkpointer=None, llm=None):
+    """Compile the graph once; the API calls this from its startup hook
+    (after load_tools(), so the model is bound to the final tool list).
+    `llm` replaces gpt-4o as the policy model (the offline benchmark passes a fake)."""
+    global tool_node, policy_llm
+    bind_kwargs = {}
+    if llm is None:
+        from langchain.chat_models import init_chat_model
+
+        llm = init_chat_model("openai:gpt-4o")
+        if PROMPT_CACHE_KEY:
+            bind_kwargs["prompt_cache_key"] = PROMPT_CACHE_KEY
+
+    tool_node = ToolNode(TOOLS)
+    policy_llm = llm.bind_tools(sorted(TOOLS, key=lambda t: t.name), **bind_kwargs)
+    return graph.compile(checkpointer=checkpointer)
+
 
 if __name__ == "__main__":
+    from langgraph.checkpoint.memory import InMemorySaver
+    from tools.github_mcp import close_mcp_pool
 
     async def test_agent():
-        print("=== Testing Tool ===")
-        out1 = await agent.ainvoke(
-            {
-                "messages": [
-                    system_prompt,
-                    HumanMessage(
-                        content="what are latest projects you are working on?"
-                    ),
-                ]
-            },
-            config={"configurable": {"thread_id": "test-thread-1"}},
-        )
-        print("Result:", out1["messages"][-1].content)
+        # The MCP sessions are bound to this loop, so load and use them in one run
+        await load_tools()
+        agent = build_agent(checkpointer=InMemorySaver())
+        try:
+            print("=== Testing Tool ===")
+            out1 = await agent.ainvoke(
+                {
+                    "messages": [
+                        HumanMessage(
+                            content="what are latest projects you are working on?"
+                        ),
+                    ]
+                },
+                config={"configurable": {"thread_id": "test-thread-1"}},
+            )
+            print("Result:", out1["messages"][-1].content)
+        finally:
+            await close_mcp_pool()
 
     asyncio.run(test_agent())
@@ -0,0 +1,137 @@
+# CONTEXT-WINDOW POLICY FOR LONG SESSIONS
+#
+# Runs before policy_llm.ainvoke in graph.py::agent_node:
+# 1. older turns are folded into a rolling summary stored in the graph state
+#    (and removed from state["messages"]) once history exceeds a threshold
+# 2. tool results from earlier turns are cut to HISTORY_STALE_TOOL_CHARS
+# 3. what is left is trimmed to a token budget on whole-turn boundaries
+
+import os
+
+from dotenv import load_dotenv
+from langchain_core.messages import (
+    HumanMessage,
+    RemoveMessage,
+    SystemMessage,
+    ToolMessage,
+)
+from langchain_core.messages.utils import count_tokens_approximately, trim_messages
+
+from telemetry import get_logger
+from admission import upstream
+
+load_dotenv()
+
+log = get_logger("history")
+
+HISTORY_MAX_TOKENS = int(os.getenv("HISTORY_MAX_TOKENS", "6000"))
+HISTORY_STALE_TOOL_CHARS = int(os.getenv("HISTORY_STALE_TOOL_CHARS", "200"))
+HISTORY_SUMMARIZE = os.getenv("HISTORY_SUMMARIZE", "true").lower() == "true"
+HISTORY_SUMMARY_TRIGGER_TOKENS = int(os.getenv("HISTORY_SUMMARY_TRIGGER_TOKENS", "4000"))
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "3"))
+HISTORY_SUMMARY_MODEL = os.getenv("HISTORY_SUMMARY_MODEL", "openai:gpt-4o-mini")
+
+SUMMARY_PROMPT = (
+    "You maintain a running summary of a chat between a user and Aayushmaan Bot. "
+    "Extend the existing summary with the new messages. Keep names, facts the user "
+    "shared, questions asked and answers given. Be brief; plain sentences only."
+)
+
+# Tags the summary call so /chat/stream doesn't send it as answer tokens
+SUMMARY_TAG = "history_summary"
+
+_summary_llm = None
+
+
+def _get_summary_llm():
+    global _summary_llm
+    if _summary_llm is None:
+        from langchain.chat_models import init_chat_model
+
+        _summary_llm = init_chat_model(HISTORY_SUMMARY_MODEL).with_config(
+            tags=[SUMMARY_TAG], run_name=SUMMARY_TAG
+        )
+    return _summary_llm
+
+
+def _turn_starts(messages):
+    """Indexes where a user turn begins (a turn never splits tool calls from results)"""
+    return [i for i, msg in enumerate(messages) if isinstance(msg, HumanMessage)]
+
+
+def drop_stale_tool_results(messages):
+    """Shorten ToolMessages from earlier turns; the current turn keeps full results"""
+    starts = _turn_starts(messages)
+    current = starts[-1] if starts else 0
+    compacted = []
+    for i, msg in enumerate(messages):
+        if i < current and isinstance(msg, ToolMessage):
+            content = str(msg.content)
+            if len(content) > HISTORY_STALE_TOOL_CHARS:
+                content = content[:HISTORY_STALE_TOOL_CHARS] + " …[earlier tool result trimmed]"
+                msg = msg.model_copy(update={"content": content})
+        compacted.append(msg)
+    return compacted
+
+
+async def summarize_history(messages, summary):
+    """Fold turns older than HISTORY_KEEP_TURNS into the rolling summary.
+
+    Returns the state update ({"summary", "messages": [RemoveMessage...]}) or {}.
+    """
+    if not HISTORY_SUMMARIZE:
+        return {}
+    if count_tokens_approximately(messages) <= HISTORY_SUMMARY_TRIGGER_TOKENS:
+        return {}
+    starts = _turn_starts(messages)
+    if len(starts) <= HISTORY_KEEP_TURNS:
+        return {}
+
+    cut = starts[-HISTORY_KEEP_TURNS]
+    old = messages[:cut]
+    transcript = "\n".join(
+        f"{msg.type}: {msg.content}" for msg in drop_stale_tool_results(old) if msg.content
+    )
+    async with upstream("openai"):
+        response = await _get_summary_llm().ainvoke(
+            [
+                SystemMessage(content=SUMMARY_PROMPT),
+                HumanMessage(
+                    content=f"Existing summary:\n{summary or '(none)'}\n\nNew messages:\n{transcript}"
+                ),
+            ]
+        )
+    log.info("🗜️ Summarized %d older messages into the rolling summary", len(old))
+    return {
+        "summary": response.content,
+        "messages": [RemoveMessage(id=msg.id) for msg in old if msg.id],
+    }
+
+
+async def apply_history_policy(messages, summary=""):
+    """Return (messages to send to the LLM, state update) for one agent step"""
+    update = await summarize_history(messages, summary)
+    if update:
+        removed = {m.id for m in update["messages"]}
+        messages = [msg for msg in messages if msg.id not in removed]
+        summary = update["summary"]
+
+    messages = drop_stale_tool_results(messages)
+    trimmed = trim_messages(
+        messages,
+        max_tokens=HISTORY_MAX_TOKENS,
+        token_counter=count_tokens_approximately,
+        strategy="last",
+        start_on="human",
+        allow_partial=False,
+    )
+    if not trimmed:
+        # The current turn alone is over budget: never drop it
+        starts = _turn_starts(messages)
+        trimmed = messages[starts[-1] :] if starts else messages
+    messages = trimmed
+    if summary:
+        messages = [
+            SystemMessage(content=f"Summary of the earlier conversation:\n{summary}")
+        ] + messages
+    return messages, update
@@ -0,0 +1,184 @@
+# KNOWLEDGE BASE INGESTION (run as a command, never at import time)
+#
+#   python ingest.py            # upsert new chunks, delete removed ones
+#   python ingest.py --reset    # wipe the vector store and ingest from scratch
+#   python ingest.py --dry-run  # only report what would change
+#
+# Every chunk gets a content-hashed id, so re-running on an unchanged PDF is a
+# no-op and an edited PDF only embeds the chunks that actually changed. The ids
+# already in the store are the source of truth for the diff, so chunks left over
+# from the old append-on-change ingestion are deleted on the first run.
+# The manifest (tools/.ingest_manifest.json) records the ingested PDF hash and
+# settings and replaces the old single-hash tools/.pdf_hash.json. The BM25
+# index used for hybrid retrieval (tools/profile.bm25.json) is rebuilt from the
+# current chunks on every run. Unchanged chunks keep their embedding but get
+# their metadata (page, chunk_index) refreshed, since an edit earlier in the PDF
+# shifts the position of everything after it.
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+
+backend_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, backend_dir)
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOOLS_DIR = os.path.join(backend_dir, "tools")
+PDF_PATH = os.path.join(TOOLS_DIR, "profile.pdf")
+MANIFEST_FILE = os.path.join(TOOLS_DIR, ".ingest_manifest.json")
+LEGACY_HASH_FILE = os.path.join(TOOLS_DIR, ".pdf_hash.json")
+
+CHUNK_SIZE = 200
+CHUNK_OVERLAP = 30
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+
+def get_file_hash(file_path):
+    """Get SHA-256 hash of a file"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(65536), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def chunk_id(text):
+    """Content-hashed chunk id (identical chunks collapse into one)"""
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()[:32]
+
+
+def load_manifest():
+    try:
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(manifest):
+    tmp = MANIFEST_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp, MANIFEST_FILE)
+
+
+def split_pdf(pdf_path=PDF_PATH):
+    """Load and split the PDF into {chunk_id: Document}"""
+    from langchain_community.document_loaders import PyPDFLoader
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+    data = PyPDFLoader(pdf_path).load()
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+    chunks = {}
+    for position, doc in enumerate(splitter.split_documents(data)):
+        doc.metadata["chunk_index"] = position
+        doc.metadata["source"] = os.path.basename(doc.metadata.get("source", pdf_path))
+        chunks.setdefault(chunk_id(doc.page_content), doc)
+    return chunks
+
+
+def stored_ids(vector_store):
+    """Ids of every chunk currently in the vector store"""
+    if hasattr(vector_store, "collection"):
+        return {str(i) for i in vector_store.collection.distinct("_id")}
+    return set(vector_store.ids)
+
+
+def refresh_metadata(vector_store, docs):
+    """Rewrite the metadata of already-stored chunks ({id: Document}), keeping their vectors"""
+    if not docs:
+        return
+    if hasattr(vector_store, "collection"):
+        from pymongo import UpdateOne
+
+        # MongoDBAtlasVectorSearch stores metadata as top-level fields
+        vector_store.collection.bulk_write(
+            [UpdateOne({"_id": cid}, {"$set": doc.metadata}) for cid, doc in docs.items()],
+            ordered=False,
+        )
+    else:
+        vector_store.update_metadata({cid: doc.metadata for cid, doc in docs.items()})
+
+
+def clear_store(vector_store):
+    if hasattr(vector_store, "collection"):
+        vector_store.collection.delete_many({})
+    else:
+        vector_store.delete(list(vector_store.ids))
+
+
+def ingest(reset=False, dry_run=False):
+    from config import get_vector_store, VECTOR_STORE, EMBEDDER
+
+    vector_store = get_vector_store()
+
+    manifest = load_manifest()
+    pdf_hash = get_file_hash(PDF_PATH)
+    settings = {
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP,
+        "embedder": EMBEDDER,
+        "vector_store": VECTOR_STORE,
+    }
+
+    if manifest and manifest.get("settings") != settings:
+        print("⚙️ Chunking/embedder/backend changed - re-ingesting everything")
+        reset = True
+
+    chunks = split_pdf()
+    previous = set() if reset else stored_ids(vector_store)
+    current = set(chunks)
+    to_add = [cid for cid in chunks if cid not in previous]
+    to_delete = sorted(previous - current)
+
+    print(
+        f"📄 {len(current)} chunks: {len(to_add)} to embed, "
+        f"{len(to_delete)} to delete, {len(current) - len(to_add)} unchanged"
+    )
+    if dry_run:
+        return {"added": len(to_add), "deleted": len(to_delete)}
+
+    if reset:
+        clear_store(vector_store)
+    if to_delete:
+        vector_store.delete(ids=to_delete)
+    for start in range(0, len(to_add), EMBED_BATCH_SIZE):
+        batch = to_add[start : start + EMBED_BATCH_SIZE]
+        # One embedding request per batch; same ids overwrite (upsert)
+        vector_store.add_documents(documents=[chunks[cid] for cid in batch], ids=batch)
+        print(f"📚 Embedded {start + len(batch)}/{len(to_add)} chunks")
+    refresh_metadata(vector_store, {cid: chunks[cid] for cid in chunks if cid in previous})
+
+    from lexical import BM25Index
+
+    ids = sorted(current)
+    BM25Index.from_documents(ids, [chunks[cid] for cid in ids]).save()
+    print(f"🔤 BM25 index built: {len(ids)} chunks")
+
+    save_manifest(
+        {
+            "pdf_hash": pdf_hash,
+            "settings": settings,
+            "chunks": sorted(current),
+        }
+    )
+    if os.path.exists(LEGACY_HASH_FILE):
+        os.remove(LEGACY_HASH_FILE)
+    print("✅ Ingestion complete")
+    return {"added": len(to_add), "deleted": len(to_delete)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest tools/profile.pdf into the vector store")
+    parser.add_argument("--reset", action="store_true", help="wipe the store and re-ingest")
+    parser.add_argument("--dry-run", action="store_true", help="only report the changes")
+    args = parser.parse_args()
+    ingest(reset=args.reset, dry_run=args.dry_run)
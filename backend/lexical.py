@@ -0,0 +1,98 @@
+# IN-PROCESS BM25 INDEX OVER THE KNOWLEDGE-BASE CHUNKS
+#
+# Built by ingest.py next to tools/profile.pdf (profile.bm25.json: ids, texts,
+# metadata) and loaded by tools/rag.py, which fuses its ranking with the vector
+# search. Catches exact terms (project names, "UNSW", "FastMCP") that embeddings
+# can rank low. The postings are rebuilt on load; the corpus is a few hundred chunks.
+
+import os
+import re
+import json
+import math
+from collections import Counter, defaultdict
+
+from langchain_core.documents import Document
+
+BM25_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools", "profile.bm25.json")
+
+STOPWORDS = set(
+    "a an and are as at be by did do does for from has have he his how i in is it its "
+    "me my of on or she that the their to was were what when where which who whom why "
+    "with you your".split()
+)
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"\w+", text.lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 (k1, b) over chunk texts, returning LangChain Documents"""
+
+    def __init__(self, ids, texts, metadatas, k1=1.5, b=0.75):
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.metadatas = list(metadatas)
+        self.k1 = k1
+        self.b = b
+        self._rows = {doc_id: row for row, doc_id in enumerate(self.ids)}
+        self._postings = defaultdict(list)  # term -> [(row, tf)]
+        self._lengths = []
+        for row, text in enumerate(self.texts):
+            counts = Counter(tokenize(text))
+            self._lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self._postings[term].append((row, tf))
+        n = len(self.texts)
+        self._avg_length = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {
+            term: math.log(1 + (n - len(rows) + 0.5) / (len(rows) + 0.5))
+            for term, rows in self._postings.items()
+        }
+
+    def __len__(self):
+        return len(self.ids)
+
+    def search(self, query, k=10):
+        """Top-k (Document, score), best first"""
+        scores = defaultdict(float)
+        for term in set(tokenize(query)):
+            idf = self._idf.get(term)
+            if idf is None:
+                continue
+            for row, tf in self._postings[term]:
+                norm = self.k1 * (1 - self.b + self.b * self._lengths[row] / self._avg_length)
+                scores[row] += idf * tf * (self.k1 + 1) / (tf + norm)
+        top = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [
+            (
+                Document(id=self.ids[row], page_content=self.texts[row], metadata=dict(self.metadatas[row])),
+                score,
+            )
+            for row, score in top
+        ]
+
+    def metadata(self, doc_id):
+        """Metadata of a chunk as of the last ingest, or None for unknown ids"""
+        row = self._rows.get(doc_id)
+        return self.metadatas[row] if row is not None else None
+
+    @classmethod
+    def from_documents(cls, ids, docs):
+        return cls(ids, [d.page_content for d in docs], [d.metadata for d in docs])
+
+    def save(self, path=BM25_PATH):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"ids": self.ids, "texts": self.texts, "metadatas": self.metadatas}, f)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path=BM25_PATH):
+        """The saved index, or None if ingest.py has not built one yet"""
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return cls(data["ids"], data["texts"], data["metadatas"])
@@ -0,0 +1,288 @@
+# LOCAL IN-PROCESS VECTOR INDEX (VECTOR_STORE=local)
+#
+# Exact cosine search over a NumPy matrix persisted next to tools/profile.pdf:
+#   profile.index.<version>/vectors.npy  float32 unit vectors, opened memory-mapped
+#   profile.index.<version>/meta.json    ids, texts, metadata and the embedder name
+#   profile.index.current                name of the live version directory
+# Every save writes a new version directory and then swaps the pointer file, so
+# a reader always gets a matching vectors/metadata pair; reload() picks up a
+# version written by another process (ingest.py). The corpus is one chunked PDF
+# (a few hundred vectors), so a brute-force matrix product is both exact and
+# sub-millisecond.
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import uuid
+from collections import namedtuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+INDEX_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tools")
+INDEX_NAME = "profile.index"
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic offline embedder: hashed word unigrams + character trigrams.
+
+    No network and stable across processes, so tests and benchmarks can run
+    without Voyage credentials. Quality is lexical, not semantic.
+    """
+
+    def __init__(self, dim=512):
+        self.dim = dim
+        self.name = f"hash-{dim}"
+
+    def _features(self, text):
+        words = re.findall(r"\w+", text.lower())
+        for word in words:
+            yield word
+            padded = f"#{word}#"
+            for i in range(len(padded) - 2):
+                yield padded[i : i + 3]
+
+    def _embed(self, text):
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for feature in self._features(text):
+            digest = hashlib.blake2b(feature.encode(), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts):
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text):
+        return self._embed(text)
+
+
+# One loaded version; searches read a single snapshot so a reload can't mix two
+_Index = namedtuple("_Index", "ids texts metadatas matrix")
+_EMPTY = _Index([], [], [], None)
+
+
+def _unit_rows(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact cosine vector store backed by a memory-mapped NumPy matrix"""
+
+    def __init__(self, embedding, index_dir=INDEX_DIR, name=INDEX_NAME):
+        self._embedding = embedding
+        self.embedder_name = getattr(
+            embedding, "name", getattr(embedding, "model", type(embedding).__name__)
+        )
+        self.index_dir = index_dir
+        self.name = name
+        self.pointer_path = os.path.join(index_dir, f"{name}.current")
+        self.version = None
+        self._index = _EMPTY
+        self._load()
+
+    @property
+    def embeddings(self):
+        return self._embedding
+
+    # Read-only views of the loaded snapshot
+    ids = property(lambda self: self._index.ids)
+    texts = property(lambda self: self._index.texts)
+    metadatas = property(lambda self: self._index.metadatas)
+    matrix = property(lambda self: self._index.matrix)
+
+    def _current_version(self):
+        try:
+            with open(self.pointer_path) as f:
+                return f.read().strip() or None
+        except OSError:
+            return None
+
+    def _legacy_paths(self):
+        # Unversioned profile.index.npy/.json written before the pointer file existed
+        base = os.path.join(self.index_dir, self.name)
+        return base + ".npy", base + ".json"
+
+    def _load(self):
+        version = self._current_version()
+        self.version = version
+        self._index = _EMPTY
+        if version is None:
+            vectors_path, meta_path = self._legacy_paths()
+        else:
+            directory = os.path.join(self.index_dir, version)
+            vectors_path = os.path.join(directory, "vectors.npy")
+            meta_path = os.path.join(directory, "meta.json")
+        if not os.path.exists(meta_path):
+            return
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            matrix = np.load(vectors_path, mmap_mode="r")
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Local index {version or meta_path!r} unreadable ({e}) - ignoring it")
+            return
+        if meta.get("embedder") != self.embedder_name:
+            print(
+                f"⚠️ Local index was built with {meta.get('embedder')!r}, "
+                f"not {self.embedder_name!r} - ignoring it"
+            )
+            return
+        self._index = _Index(meta["ids"], meta["texts"], meta["metadatas"], matrix)
+
+    def reload(self):
+        """Load the live version if another process saved a new one; True if it changed"""
+        if self._current_version() == self.version:
+            return False
+        self._load()
+        return True
+
+    def _save(self, ids, texts, metadatas, matrix):
+        version = f"{self.name}.{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        directory = os.path.join(self.index_dir, version)
+        os.makedirs(directory)
+        vectors = matrix if matrix is not None else np.zeros((0, 0), np.float32)
+        np.save(os.path.join(directory, "vectors.npy"), np.ascontiguousarray(vectors, dtype=np.float32))
+        with open(os.path.join(directory, "meta.json"), "w") as f:
+            json.dump(
+                {"embedder": self.embedder_name, "ids": ids, "texts": texts, "metadatas": metadatas},
+                f,
+            )
+        # One atomic pointer swap publishes both files together
+        tmp = self.pointer_path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(version)
+        os.replace(tmp, self.pointer_path)
+        previous, self.version = self.version, version
+        self._index = _Index(
+            ids, texts, metadatas, np.load(os.path.join(directory, "vectors.npy"), mmap_mode="r")
+        )
+        self._prune(keep={version, previous})
+        for path in self._legacy_paths():
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _prune(self, keep):
+        """Delete old versions; the previous one stays for readers still switching over"""
+        prefix = f"{self.name}."
+        for entry in os.listdir(self.index_dir):
+            path = os.path.join(self.index_dir, entry)
+            if entry.startswith(prefix) and entry not in keep and os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def is_empty(self):
+        return not self.ids
+
+    def add_texts(self, texts, metadatas=None, ids=None, **kwargs):
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = list(metadatas) if metadatas else [{} for _ in texts]
+        ids = list(ids) if ids else [str(uuid.uuid4()) for _ in texts]
+        vectors = _unit_rows(
+            np.asarray(self._embedding.embed_documents(texts), dtype=np.float32)
+        )
+
+        # Replace existing ids (upsert), append new ones
+        kept = self._without(set(ids))
+        existing = np.asarray(kept.matrix) if kept.matrix is not None and kept.ids else None
+        self._save(
+            kept.ids + ids,
+            kept.texts + texts,
+            kept.metadatas + metadatas,
+            vectors if existing is None else np.vstack([existing, vectors]),
+        )
+        return ids
+
+    def _without(self, drop):
+        index = self._index
+        keep = [i for i, doc_id in enumerate(index.ids) if doc_id not in drop]
+        if len(keep) == len(index.ids):
+            return index
+        return _Index(
+            [index.ids[i] for i in keep],
+            [index.texts[i] for i in keep],
+            [index.metadatas[i] for i in keep],
+            np.asarray(index.matrix)[keep] if keep else None,
+        )
+
+    def delete(self, ids=None, **kwargs):
+        if not ids:
+            return True
+        kept = self._without(set(ids))
+        if kept is not self._index:
+            self._save(*kept)
+        return True
+
+    def update_metadata(self, metadatas):
+        """Replace the metadata of existing ids ({id: metadata}) without re-embedding"""
+        index = self._index
+        rows = {doc_id: row for row, doc_id in enumerate(index.ids)}
+        updated = list(index.metadatas)
+        for doc_id, metadata in metadatas.items():
+            row = rows.get(doc_id)
+            if row is not None:
+                updated[row] = dict(metadata)
+        if updated == index.metadatas:
+            return False
+        self._save(index.ids, index.texts, updated, index.matrix)
+        return True
+
+    @staticmethod
+    def _doc(index, row, score=None):
+        metadata = dict(index.metadatas[row])
+        if score is not None:
+            metadata["score"] = score
+        return Document(id=index.ids[row], page_content=index.texts[row], metadata=metadata)
+
+    def batch_similarity_search_by_vector(self, vectors, k=4):
+        """Top-k (Document, score) lists for several query vectors in one matrix product"""
+        index = self._index
+        if index.matrix is None or not index.ids:
+            return [[] for _ in vectors]
+        queries = _unit_rows(np.asarray(vectors, dtype=np.float32))
+        scores = queries @ np.asarray(index.matrix).T
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        results = []
+        for q, rows in enumerate(top):
+            rows = rows[np.argsort(-scores[q, rows])]
+            results.append(
+                [(self._doc(index, r, float(scores[q, r])), float(scores[q, r])) for r in rows]
+            )
+        return results
+
+    def similarity_search_with_score_by_vector(self, embedding, k=4, **kwargs):
+        return self.batch_similarity_search_by_vector([embedding], k=k)[0]
+
+    def similarity_search_by_vector(self, embedding, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k)]
+
+    def similarity_search_with_score(self, query, k=4, **kwargs):
+        return self.similarity_search_with_score_by_vector(
+            self._embedding.embed_query(query), k
+        )
+
+    def similarity_search(self, query, k=4, **kwargs):
+        return [doc for doc, _ in self.similarity_search_with_score(query, k)]
+
+    def _select_relevance_score_fn(self):
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, ids=None, **kwargs):
+        store = cls(embedding, **kwargs)
+        store.add_texts(texts, metadatas=metadatas, ids=ids)
+        return store
@@ -0,0 +1,167 @@
+# SEMANTIC ANSWER CACHE IN FRONT OF THE AGENT GRAPH
+#
+# Looks up the user's message by embedding similarity before agent.ainvoke.
+# Answers are stored with a scope derived from the tools used in the turn:
+# turns that touched a time-sensitive tool (now_tool, web_search_tool) are
+# never stored, nor are turns where a tool call timed out or failed. Entries
+# are dropped when the knowledge base is re-ingested.
+
+import os
+import time
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+load_dotenv()
+
+SEMANTIC_CACHE = os.getenv("SEMANTIC_CACHE", "false").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "512"))
+# Follow-ups ("tell me more") depend on the conversation, so by default the
+# cache only answers the first message of a session
+SEMANTIC_CACHE_FIRST_TURN_ONLY = (
+    os.getenv("SEMANTIC_CACHE_FIRST_TURN_ONLY", "true").lower() == "true"
+)
+
+# Tools whose answers go stale quickly: a turn using any of them is never cached
+UNCACHEABLE_TOOLS = {"now_tool", "web_search_tool"}
+
+# TTL (seconds) per scope; the scope is the most volatile tool class used in the turn
+SCOPE_TTL = {
+    "none": float(os.getenv("SEMANTIC_CACHE_TTL", "86400")),
+    "knowledge": float(os.getenv("SEMANTIC_CACHE_TTL", "86400")),
+    "github": float(os.getenv("SEMANTIC_CACHE_GITHUB_TTL", "3600")),
+}
+
+
+def turn_tool_names(messages):
+    """Names of the tools called since the last HumanMessage"""
+    names = set()
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        if isinstance(msg, AIMessage):
+            names.update(tc["name"] for tc in msg.tool_calls)
+    return names
+
+
+def turn_tool_failed(messages):
+    """True when a tool call since the last HumanMessage timed out or failed"""
+    for msg in reversed(messages):
+        if isinstance(msg, HumanMessage):
+            break
+        if isinstance(msg, ToolMessage) and msg.status == "error":
+            return True
+    return False
+
+
+def scope_for(messages):
+    """Cache scope for a turn's messages, or None when it must not be cached"""
+    # An answer built around a timeout or failure (deadlines.py) must not outlive it
+    if turn_tool_failed(messages):
+        return None
+    tool_names = turn_tool_names(messages)
+    if tool_names & UNCACHEABLE_TOOLS:
+        return None
+    if tool_names - {"rag_tool"}:
+        return "github"
+    if tool_names:
+        return "knowledge"
+    return "none"
+
+
+class SemanticCache:
+    """Exact cosine lookup over cached question embeddings with LRU + TTL eviction"""
+
+    def __init__(self, threshold=SEMANTIC_CACHE_THRESHOLD, maxsize=SEMANTIC_CACHE_SIZE):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self._entries = OrderedDict()  # id -> {"vector", "answer", "scope", "expires"}
+        self._next_id = 0
+        self._matrix = None
+        self._ids = []
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    def _rebuild(self):
+        self._ids = list(self._entries)
+        if self._ids:
+            self._matrix = np.vstack([self._entries[i]["vector"] for i in self._ids])
+        else:
+            self._matrix = None
+
+    def _check_version(self, version):
+        if version != self.version:
+            if self._entries:
+                print("📄 Knowledge base changed - clearing semantic answer cache")
+            self.clear()
+            self.version = version
+
+    def clear(self):
+        self._entries.clear()
+        self._matrix = None
+        self._ids = []
+
+    @staticmethod
+    def _unit(vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, vector, version=None):
+        """Return the cached answer for the closest question above the threshold"""
+        self._check_version(version)
+        now = time.monotonic()
+        expired = [i for i, e in self._entries.items() if e["expires"] < now]
+        for i in expired:
+            del self._entries[i]
+        if expired or (self._matrix is None and self._entries):
+            self._rebuild()
+        if self._matrix is None:
+            self.misses += 1
+            return None
+
+        scores = self._matrix @ self._unit(vector)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            self.misses += 1
+            return None
+        entry_id = self._ids[best]
+        self._entries.move_to_end(entry_id)
+        self.hits += 1
+        return self._entries[entry_id]["answer"]
+
+    def store(self, vector, answer, scope, version=None):
+        self._check_version(version)
+        if scope is None:
+            return
+        self._entries[self._next_id] = {
+            "vector": self._unit(vector),
+            "answer": answer,
+            "scope": scope,
+            "expires": time.monotonic() + SCOPE_TTL[scope],
+        }
+        self._next_id += 1
+        self.stores += 1
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        self._rebuild()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "name": "semantic_answers",
+            "enabled": SEMANTIC_CACHE,
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+semantic_cache = SemanticCache()
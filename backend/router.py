@@ -0,0 +1,260 @@
+# DETERMINISTIC FAST-PATH ROUTER IN FRONT OF THE AGENT NODE
+#
+# Trivial intents ("what time is it", the forced answers in tools/prompt.py)
+# are matched against an intent table by regex on the normalized message and,
+# with ROUTER_EMBEDDINGS=true, by embedding similarity to the intent's example
+# questions. The forced-answer intents are built from tools/prompt.py.
+# A hit answers directly (or after one tool call) and skips gpt-4o entirely;
+# a miss falls through to the agent. Every decision is logged and counted.
+
+import os
+import re
+import asyncio
+import json
+import time
+import uuid
+
+import numpy as np
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage, HumanMessage
+
+from telemetry import get_logger
+from tools.prompt import FORCED_ANSWERS
+
+load_dotenv()
+
+log = get_logger("router")
+
+ROUTER = os.getenv("ROUTER", "true").lower() == "true"
+# Off by default: it costs an embedding round trip on every short miss
+ROUTER_EMBEDDINGS = os.getenv("ROUTER_EMBEDDINGS", "false").lower() == "true"
+ROUTER_THRESHOLD = float(os.getenv("ROUTER_THRESHOLD", "0.9"))
+# Longer messages are never trivial; don't spend an embedding on them
+ROUTER_MAX_CHARS = int(os.getenv("ROUTER_MAX_CHARS", "60"))
+# Optional JSON file with the same shape as DEFAULT_INTENTS
+ROUTER_INTENTS_PATH = os.getenv("ROUTER_INTENTS_PATH")
+
+# Extra phrasings for the forced answers in tools/prompt.py, keyed by question;
+# a question without an entry still matches its own normalized text
+FORCED_PATTERNS = {
+    "Who are you?": ("who_are_you", [r"who (are|r) (you|u)"], []),
+    "How old are you?": (
+        "age",
+        [r"how old (are|r) (you|u)", r"what(s| is) your age"],
+        ["What is your age?"],
+    ),
+    "Who built you?": (
+        "who_built_you",
+        [r"who (built|made|created|developed|coded) (you|u|this bot)"],
+        ["Who made this bot?"],
+    ),
+}
+
+
+def normalize(text):
+    text = text.lower().replace("’", "'")
+    text = re.sub(r"'", "", text)
+    text = re.sub(r"[^\w\s]", " ", text)
+    return " ".join(text.split())
+
+
+def forced_intents():
+    """Fixed-answer intents for the forced answers in the system prompt"""
+    intents = []
+    for question, reply in FORCED_ANSWERS:
+        name, patterns, examples = FORCED_PATTERNS.get(question, (None, [], []))
+        text = normalize(question)
+        intents.append({
+            "name": name or text.replace(" ", "_"),
+            "patterns": [re.escape(text)] + patterns,
+            "examples": [question] + examples,
+            "answer": reply,
+        })
+    return intents
+
+
+# Each intent has regex `patterns` (full match on the normalized message),
+# `examples` for embedding matching, and either a fixed `answer` or a `tool`
+# (called with `args`) whose result is formatted into `answer` as {result}.
+DEFAULT_INTENTS = [
+    {
+        "name": "current_time",
+        "patterns": [
+            r"what time is it( now| right now)?",
+            r"what(s| is) the (current )?(time|date)( now| right now| today)?",
+            r"what(s| is) today(s)? date",
+            r"what (day|date) is it( today)?",
+            r"(current )?(time|date) (now|please)",
+        ],
+        "examples": [
+            "What time is it?",
+            "What's today's date?",
+            "What is the current time?",
+        ],
+        "tool": "now_tool",
+        "args": {},
+        "answer": "It's {result} right now ⏰",
+    },
+] + forced_intents()
+
+
+def load_intents(path=ROUTER_INTENTS_PATH):
+    if not path:
+        return DEFAULT_INTENTS
+    with open(path) as f:
+        return json.load(f)
+
+
+INTENTS = load_intents()
+_patterns = [
+    (intent, [re.compile(p) for p in intent.get("patterns", [])]) for intent in INTENTS
+]
+# Example embeddings, computed on first use: (matrix, intent per row)
+_examples = None
+
+router_stats = {
+    "decisions": 0,
+    "misses": 0,
+    "hits": {},
+    "methods": {"pattern": 0, "embedding": 0},
+    "route_ms": 0.0,
+    "llm_calls_saved": 0,
+    "llm_calls": 0,
+    "llm_ms": 0.0,
+}
+
+
+def match_pattern(text):
+    for intent, patterns in _patterns:
+        if any(p.fullmatch(text) for p in patterns):
+            return intent
+    return None
+
+
+async def _example_matrix():
+    global _examples
+    if _examples is None:
+        from tools.rag import aembed_query_cached
+
+        rows, owners = [], []
+        for intent in INTENTS:
+            for example in intent.get("examples", []):
+                rows.append(example)
+                owners.append(intent)
+        # Embedded as queries, like the messages they are compared against
+        vectors = await asyncio.gather(*(aembed_query_cached(row) for row in rows))
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        _examples = (matrix, owners)
+    return _examples
+
+
+async def match_embedding(message):
+    """(intent or None, best cosine score)"""
+    from tools.rag import aembed_query_cached
+
+    matrix, owners = await _example_matrix()
+    if not owners:
+        return None, 0.0
+    query = np.asarray(await aembed_query_cached(message), dtype=np.float32)
+    scores = matrix @ (query / (np.linalg.norm(query) + 1e-12))
+    best = int(np.argmax(scores))
+    score = float(scores[best])
+    return (owners[best] if score >= ROUTER_THRESHOLD else None), score
+
+
+async def classify(message):
+    """(intent, method, score) for a user message; intent is None on a miss"""
+    text = normalize(message)
+    intent = match_pattern(text)
+    if intent is not None:
+        return intent, "pattern", 1.0
+    if not ROUTER_EMBEDDINGS or len(text) > ROUTER_MAX_CHARS:
+        return None, None, 0.0
+    try:
+        intent, score = await match_embedding(message)
+    except Exception as e:
+        log.warning("⚠️ Router embedding match failed: %s", e)
+        return None, None, 0.0
+    return intent, ("embedding" if intent else None), score
+
+
+async def answer(intent, tools_by_name):
+    """Messages that complete the turn for a matched intent"""
+    tool_name = intent.get("tool")
+    if not tool_name:
+        return [AIMessage(content=intent["answer"])]
+
+    call = {
+        "name": tool_name,
+        "args": dict(intent.get("args", {})),
+        "id": f"router_{uuid.uuid4().hex[:12]}",
+        "type": "tool_call",
+    }
+    # A ToolCall returns the ToolMessage, so deadline/tool errors show up as status="error"
+    message = await tools_by_name[tool_name].ainvoke(call)
+    if message.status == "error":
+        raise RuntimeError(message.content)
+    return [
+        AIMessage(content="", tool_calls=[call]),
+        message,
+        AIMessage(content=intent["answer"].format(result=message.content)),
+    ]
+
+
+async def route(messages, tools_by_name):
+    """Answer messages for a fast-path hit, or None to fall through to the agent"""
+    if not ROUTER or not messages or not isinstance(messages[-1], HumanMessage):
+        return None
+
+    started = time.perf_counter()
+    intent, method, score = await classify(messages[-1].content)
+    if intent is not None and intent.get("tool") and intent["tool"] not in tools_by_name:
+        intent = None
+
+    reply = None
+    if intent is not None:
+        try:
+            reply = await answer(intent, tools_by_name)
+        except Exception as e:
+            log.warning("⚠️ Router fast path for %s failed: %s", intent["name"], e)
+
+    elapsed = (time.perf_counter() - started) * 1000
+    router_stats["decisions"] += 1
+    router_stats["route_ms"] += elapsed
+    if reply is None:
+        router_stats["misses"] += 1
+        log.info("🧭 Router miss (%.1f ms, best score %.2f)", elapsed, score)
+        return None
+
+    name = intent["name"]
+    router_stats["hits"][name] = router_stats["hits"].get(name, 0) + 1
+    router_stats["methods"][method] += 1
+    # A tool intent would have cost the agent two gpt-4o calls, a fixed answer one
+    router_stats["llm_calls_saved"] += 2 if intent.get("tool") else 1
+    log.info("🧭 Router hit: %s via %s (score %.2f, %.1f ms)", name, method, score, elapsed)
+    return reply
+
+
+def record_llm_call(elapsed_ms):
+    """Called by the agent node to estimate the latency a fast-path hit saves"""
+    router_stats["llm_calls"] += 1
+    router_stats["llm_ms"] += elapsed_ms
+
+
+def stats():
+    s = router_stats
+    hits = sum(s["hits"].values())
+    avg_llm_ms = s["llm_ms"] / s["llm_calls"] if s["llm_calls"] else 0.0
+    return {
+        "enabled": ROUTER,
+        "decisions": s["decisions"],
+        "hits": dict(s["hits"]),
+        "misses": s["misses"],
+        "hit_rate": round(hits / s["decisions"], 3) if s["decisions"] else 0.0,
+        "methods": dict(s["methods"]),
+        "avg_route_ms": round(s["route_ms"] / s["decisions"], 2) if s["decisions"] else 0.0,
+        "avg_llm_ms": round(avg_llm_ms, 1),
+        "llm_calls_saved": s["llm_calls_saved"],
+        "est_saved_ms": round(s["llm_calls_saved"] * avg_llm_ms, 1),
+    }
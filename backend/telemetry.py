@@ -0,0 +1,342 @@
+# STRUCTURED LOGGING, SPANS AND PROMETHEUS METRICS
+#
+# Logging: level-controlled `aayushbot.*` loggers (LOG_LEVEL, LOG_FORMAT=text|json).
+# Spans: a LangChain callback handler turns every graph node, tool call and LLM
+# call of a turn into an OpenTelemetry-style span (trace id, span id, parent,
+# duration, token counts). TRACING=log writes them as structured log records,
+# TRACING=otel also starts real spans through opentelemetry-api (a no-op unless
+# an SDK/exporter is configured), TRACING=off attaches nothing.
+# Metrics: METRICS=true exposes Prometheus histograms/counters on /metrics.
+# With both off, callbacks() is empty and request_span() is a bare yield.
+
+import os
+import json
+import time
+import logging
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+
+load_dotenv()
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()
+TRACING = os.getenv("TRACING", "off").lower()
+METRICS = os.getenv("METRICS", "false").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT):
+    root = logging.getLogger("aayushbot")
+    if root.handlers:
+        return root
+    handler = logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root.addHandler(handler)
+    root.setLevel(level)
+    root.propagate = False
+    return root
+
+
+def get_logger(name):
+    setup_logging()
+    return logging.getLogger(f"aayushbot.{name}")
+
+
+log = get_logger("trace")
+
+
+# PROMETHEUS METRICS (created only when METRICS=true)
+
+_metrics = None
+
+
+def get_metrics():
+    global _metrics
+    if _metrics is None and METRICS:
+        from prometheus_client import Counter, Gauge, Histogram
+
+        _metrics = {
+            "request_seconds": Histogram(
+                "aayushbot_request_seconds", "HTTP request latency", ["endpoint"],
+                buckets=LATENCY_BUCKETS,
+            ),
+            "inflight": Gauge("aayushbot_inflight_requests", "Requests in progress", ["endpoint"]),
+            "node_seconds": Histogram(
+                "aayushbot_node_seconds", "Graph node latency", ["node"], buckets=LATENCY_BUCKETS
+            ),
+            "tool_seconds": Histogram(
+                "aayushbot_tool_seconds", "Tool call latency", ["tool"], buckets=LATENCY_BUCKETS
+            ),
+            "tool_calls": Counter(
+                "aayushbot_tool_calls_total", "Tool calls", ["tool", "status"]
+            ),
+            "tool_failures": Counter(
+                "aayushbot_tool_failures_total", "Tool calls that timed out or failed",
+                ["tool", "outcome"],
+            ),
+            "llm_seconds": Histogram(
+                "aayushbot_llm_seconds", "LLM call latency", ["model"], buckets=LATENCY_BUCKETS
+            ),
+            "llm_tokens": Counter(
+                "aayushbot_llm_tokens_total", "LLM tokens (input, cached input, output)", ["model", "kind"]
+            ),
+            "cache_hits": Gauge("aayushbot_cache_hits", "Cache hits", ["cache"]),
+            "cache_misses": Gauge("aayushbot_cache_misses", "Cache misses", ["cache"]),
+            "cache_hit_ratio": Gauge("aayushbot_cache_hit_ratio", "Cache hit ratio", ["cache"]),
+            "sessions": Gauge("aayushbot_sessions", "Conversation sessions held by the checkpointer"),
+            "queue_depth": Gauge("aayushbot_admission_queue_depth", "Chat turns waiting for a slot"),
+            "active_turns": Gauge("aayushbot_admission_active", "Chat turns holding a slot"),
+            "queue_wait_seconds": Histogram(
+                "aayushbot_admission_wait_seconds", "Time chat turns waited for admission",
+                buckets=LATENCY_BUCKETS,
+            ),
+            "admission_rejected": Counter(
+                "aayushbot_admission_rejected_total", "Chat turns rejected by admission control",
+                ["reason"],
+            ),
+        }
+    return _metrics
+
+
+def render_metrics(caches=(), sessions=None, admission=None):
+    """Prometheus exposition text; cache, session and queue stats are sampled at scrape time"""
+    from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+
+    metrics = get_metrics()
+    for stats in caches:
+        name = stats.get("name", "unknown")
+        metrics["cache_hits"].labels(name).set(stats.get("hits", 0))
+        metrics["cache_misses"].labels(name).set(stats.get("misses", 0))
+        metrics["cache_hit_ratio"].labels(name).set(stats.get("hit_rate", 0.0))
+    if sessions is not None:
+        metrics["sessions"].set(sessions)
+    if admission is not None:
+        metrics["queue_depth"].set(admission["queue_depth"])
+        metrics["active_turns"].set(admission["active"])
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+@contextmanager
+def request_span(endpoint, **fields):
+    """Time one HTTP request (histogram, in-flight gauge, span log record)"""
+    metrics = get_metrics()
+    if metrics is None and TRACING == "off":
+        yield
+        return
+    started = time.perf_counter()
+    if metrics is not None:
+        metrics["inflight"].labels(endpoint).inc()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        if metrics is not None:
+            metrics["inflight"].labels(endpoint).dec()
+            metrics["request_seconds"].labels(endpoint).observe(elapsed)
+        if TRACING != "off":
+            log.info(
+                "span request %s %.1f ms",
+                endpoint,
+                elapsed * 1000,
+                extra={"fields": {
+                    "kind": "request", "name": endpoint, "status": status,
+                    "duration_ms": round(elapsed * 1000, 2), **fields,
+                }},
+            )
+
+
+# SPANS FROM LANGCHAIN CALLBACKS
+
+
+def _usage(response):
+    """(input, cached input, output) tokens of an LLMResult, when the provider reported them"""
+    try:
+        usage = response.generations[0][0].message.usage_metadata or {}
+    except (AttributeError, IndexError):
+        usage = {}
+    cached = (usage.get("input_token_details") or {}).get("cache_read")
+    return usage.get("input_tokens"), cached, usage.get("output_tokens")
+
+
+SPAN_TOKEN_FIELDS = ("model", "input_tokens", "cached_tokens", "output_tokens")
+
+
+class TelemetryHandler(BaseCallbackHandler):
+    """Spans for graph nodes, tools and chat model calls of one or more runs.
+
+    Runs that are not spans themselves (the ToolNode, prompt templates, ...)
+    only record their trace id and nearest span ancestor, so every span gets
+    the right parent.
+    """
+
+    run_inline = True  # cheap bookkeeping; don't hop to a thread per event
+
+    def __init__(self):
+        self._ctx = {}  # run_id -> (trace_id, nearest span ancestor)
+        self._spans = {}  # run_id -> open span
+
+    def _context(self, run_id, parent_run_id):
+        if parent_run_id is None:
+            ctx = (run_id, None)
+        else:
+            trace_id, ancestor = self._ctx.get(parent_run_id, (parent_run_id, None))
+            ctx = (trace_id, parent_run_id if parent_run_id in self._spans else ancestor)
+        self._ctx[run_id] = ctx
+        return ctx
+
+    def _start(self, kind, name, run_id, parent_run_id, **attrs):
+        trace_id, parent = self._context(run_id, parent_run_id)
+        span = {"kind": kind, "name": name, "started": time.perf_counter(), **attrs}
+        span["trace_id"], span["parent_id"] = trace_id, parent
+        if TRACING == "otel":
+            span["otel"] = _otel_start(kind, name, self._spans.get(parent))
+        self._spans[run_id] = span
+
+    def _end(self, run_id, status="ok", **attrs):
+        self._ctx.pop(run_id, None)
+        span = self._spans.pop(run_id, None)
+        if span is None:
+            return
+        elapsed = time.perf_counter() - span["started"]
+        span.update(attrs)
+        _observe(span, elapsed, status)
+        if TRACING == "otel":
+            _otel_end(span.pop("otel"), span, status)
+        if TRACING != "off":
+            log.info(
+                "span %s %s %.1f ms",
+                span["kind"],
+                span["name"],
+                elapsed * 1000,
+                extra={"fields": {
+                    "kind": span["kind"],
+                    "name": span["name"],
+                    "trace_id": str(span["trace_id"]),
+                    "span_id": str(run_id),
+                    "parent_id": str(span["parent_id"]) if span["parent_id"] else None,
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 2),
+                    **{k: v for k, v in span.items() if k in SPAN_TOKEN_FIELDS},
+                }},
+            )
+
+    # graph and nodes
+    def on_chain_start(self, serialized, inputs, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        name = kwargs.get("name")
+        if parent_run_id is None:
+            self._start("graph", name or "graph", run_id, None)
+        elif metadata and name == metadata.get("langgraph_node") and run_id not in self._spans:
+            self._start("node", name, run_id, parent_run_id)
+        else:
+            self._context(run_id, parent_run_id)
+
+    def on_chain_end(self, outputs, *, run_id, **kwargs):
+        self._end(run_id)
+
+    def on_chain_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error")
+
+    # tools
+    def on_tool_start(self, serialized, input_str, *, run_id, parent_run_id=None, **kwargs):
+        name = kwargs.get("name") or (serialized or {}).get("name", "tool")
+        self._start("tool", name, run_id, parent_run_id)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        # Handled tool errors (deadlines.py) end normally with an error ToolMessage
+        self._end(run_id, status="error" if getattr(output, "status", None) == "error" else "ok")
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error")
+
+    # chat models
+    def on_chat_model_start(self, serialized, messages, *, run_id, parent_run_id=None, metadata=None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or kwargs.get("name") or "llm"
+        self._start("llm", model, run_id, parent_run_id, model=model)
+
+    def on_llm_end(self, response, *, run_id, **kwargs):
+        input_tokens, cached_tokens, output_tokens = _usage(response)
+        self._end(
+            run_id,
+            input_tokens=input_tokens,
+            cached_tokens=cached_tokens,
+            output_tokens=output_tokens,
+        )
+
+    def on_llm_error(self, error, *, run_id, **kwargs):
+        self._end(run_id, status="error")
+
+
+def _observe(span, elapsed, status):
+    metrics = get_metrics()
+    if metrics is None:
+        return
+    kind, name = span["kind"], span["name"]
+    if kind == "node":
+        metrics["node_seconds"].labels(name).observe(elapsed)
+    elif kind == "tool":
+        metrics["tool_seconds"].labels(name).observe(elapsed)
+        metrics["tool_calls"].labels(name, status).inc()
+    elif kind == "llm":
+        metrics["llm_seconds"].labels(name).observe(elapsed)
+        for key in ("input", "cached", "output"):
+            tokens = span.get(f"{key}_tokens")
+            if tokens:
+                metrics["llm_tokens"].labels(name, key).inc(tokens)
+
+
+def _otel_start(kind, name, parent_span):
+    from opentelemetry import trace
+
+    context = None
+    if parent_span is not None and parent_span.get("otel") is not None:
+        context = trace.set_span_in_context(parent_span["otel"])
+    tracer = trace.get_tracer("aayushbot")
+    return tracer.start_span(f"{kind} {name}", context=context)
+
+
+def _otel_end(otel_span, span, status):
+    from opentelemetry.trace import Status, StatusCode
+
+    for key in SPAN_TOKEN_FIELDS:
+        if span.get(key) is not None:
+            otel_span.set_attribute(f"llm.{key}", span[key])
+    if status == "error":
+        otel_span.set_status(Status(StatusCode.ERROR))
+    otel_span.end()
+
+
+_handler = None
+
+
+def callbacks():
+    """Callbacks to pass in a graph run's config; empty when telemetry is off"""
+    global _handler
+    if TRACING == "off" and not METRICS:
+        return []
+    if _handler is None:
+        _handler = TelemetryHandler()
+    return [_handler]
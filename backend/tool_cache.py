@@ -0,0 +1,90 @@
+# SHARED TTL CACHE + REQUEST COALESCING FOR EXTERNAL TOOL CALLS
+#
+# One layer of the tool pipeline (tool_pipeline.py). Results are cached per tool for TOOL_CACHE_TTL seconds,
+# keyed by tool name and normalized args; identical calls that arrive while one
+# is in flight share its result (single-flight). Errors are never cached. The
+# shared call is cancelled once every caller waiting on it has been cancelled
+# (see deadlines.py), so nobody keeps paying for a result no one will read.
+
+import os
+import json
+import asyncio
+from functools import partial
+
+from cache import TTLCache
+
+# Seconds to keep each tool's results; tools not listed are never cached
+# (now_tool is time-sensitive, rag_tool has its own embedding/retrieval caches)
+TOOL_CACHE_TTL = {
+    "web_search_tool": float(os.getenv("TOOL_CACHE_TTL_WEB_SEARCH", "300")),
+    "search_repositories": float(os.getenv("TOOL_CACHE_TTL_GITHUB", "600")),
+    "get_file_contents": float(os.getenv("TOOL_CACHE_TTL_GITHUB", "600")),
+    "list_commits": float(os.getenv("TOOL_CACHE_TTL_GITHUB", "600")),
+}
+
+tool_result_cache = TTLCache(
+    "tool_results", maxsize=int(os.getenv("TOOL_CACHE_SIZE", "1024")), ttl=300.0
+)
+_in_flight = {}
+coalesced = {"count": 0}
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return " ".join(value.lower().split())
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def cache_key(name, args):
+    return name, json.dumps(_normalize(args), sort_keys=True, default=str)
+
+
+async def cached_call(name, args, call, ttl):
+    """Return a cached result, join an identical in-flight call, or run `call()`"""
+    key = cache_key(name, args)
+    result = tool_result_cache.get(key)
+    if result is not None:
+        return result
+
+    entry = _in_flight.get(key)
+    if entry is not None:
+        coalesced["count"] += 1
+    else:
+        entry = _in_flight[key] = {"task": asyncio.ensure_future(call()), "waiters": 0}
+        entry["task"].add_done_callback(partial(_finish, key, entry, ttl))
+    entry["waiters"] += 1
+    try:
+        return await asyncio.shield(entry["task"])
+    except asyncio.CancelledError:
+        if entry["waiters"] == 1:
+            entry["task"].cancel()
+        raise
+    finally:
+        entry["waiters"] -= 1
+
+
+def _finish(key, entry, ttl, task):
+    if _in_flight.get(key) is entry:
+        del _in_flight[key]
+    if not task.cancelled() and task.exception() is None:
+        tool_result_cache.set(key, task.result(), ttl=ttl)
+
+
+def with_cache(name, call):
+    """`call` with its results cached and coalesced, if the tool has a TTL"""
+    ttl = TOOL_CACHE_TTL.get(name)
+    if not ttl:
+        return call
+
+    async def cached(**kwargs):
+        return await cached_call(name, kwargs, lambda: call(**kwargs), ttl)
+
+    return cached
+
+
+def tool_cache_stats():
+    return {**tool_result_cache.stats(), "coalesced": coalesced["count"]}
@@ -0,0 +1,64 @@
+# ONE TOOL RUN PER CALL
+#
+# Every tool in graph.py::TOOLS is wrapped once: a single StructuredTool with
+# the original name, description and argument schema, whose coroutine stacks
+# the call layers (outermost first):
+#   deadline (deadlines.py) → cache + coalescing (tool_cache.py)
+#   → compaction (compact.py) → upstream slot (admission.py) → the tool
+# The original tool's function is called directly rather than through its own
+# ainvoke, so /chat/stream and telemetry see one tool_start/tool_end per call
+# (tool_end carries the compacted output), while runs nested inside the tool
+# (the RAG synthesis LLM, MCP calls) still report under the wrapper's run.
+# Keep it to one StructuredTool: each tool run costs ~0.5 ms of CPU (argument
+# validation, signature inspection, callback setup), and one per layer added
+# ~0.9 ms per turn, ~20% on the offline benchmark's graph p95.
+
+import asyncio
+
+from langchain_core.tools import StructuredTool
+
+from admission import with_upstream_limit
+from compact import with_compaction
+from deadlines import with_deadline
+from tool_cache import with_cache
+
+
+def _runner(tool):
+    """Coroutine running the tool's own function with already-validated args"""
+    coroutine = getattr(tool, "coroutine", None)
+    if coroutine is not None:
+        return coroutine
+    func = getattr(tool, "func", None)
+    if func is not None:
+
+        async def run_sync(**kwargs):
+            # to_thread copies the context, so nested runs keep their parent
+            return await asyncio.to_thread(func, **kwargs)
+
+        return run_sync
+
+    async def run_tool(**kwargs):
+        # Not a StructuredTool: nothing to unwrap, at the cost of a nested tool run
+        return await tool.ainvoke(kwargs)
+
+    return run_tool
+
+
+def wrap_tool(tool):
+    call = _runner(tool)
+    for layer in (with_upstream_limit, with_compaction, with_cache, with_deadline):
+        call = layer(tool.name, call)
+
+    return StructuredTool(
+        name=tool.name,
+        description=tool.description,
+        args_schema=tool.args_schema,
+        coroutine=call,
+        return_direct=tool.return_direct,
+        # ToolException from with_deadline -> ToolMessage(status="error") with its JSON
+        handle_tool_error=True,
+    )
+
+
+def wrap_tools(tools):
+    return [wrap_tool(tool) for tool in tools]
@@ -2,69 +2,273 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
-import asyncio
-from langchain_mcp_adapters.client import MultiServerMCPClient
-from langgraph.prebuilt import create_react_agent
 import os
+import time
+import shutil
+import asyncio
+
+from langchain_core.tools import StructuredTool
 
 token = os.getenv("GITHUB_PERSONAL_ACCESS_TOKEN")
 username = os.getenv("GITHUB_USERNAME")
 
+# Long-lived stdio sessions to the GitHub MCP server (one Node process each)
+MCP_POOL_SIZE = int(os.getenv("MCP_POOL_SIZE", "2"))
+MCP_MAX_CONCURRENCY = int(os.getenv("MCP_MAX_CONCURRENCY", "4"))
+MCP_HEALTH_INTERVAL = float(os.getenv("MCP_HEALTH_INTERVAL", "30"))
+MCP_ACQUIRE_TIMEOUT = float(os.getenv("MCP_ACQUIRE_TIMEOUT", "30"))
+# Startup gives up after this long, or as soon as every session's first connect failed
+MCP_START_TIMEOUT = float(os.getenv("MCP_START_TIMEOUT", "15"))
+# Whether the app's readiness check waits for the GitHub tools (false: report only)
+MCP_REQUIRED = os.getenv("MCP_REQUIRED", "true").lower() == "true"
 
-async def mcp_hub():
-    client = MultiServerMCPClient(
-        {
-            "github": {
-                "command": "npx",
-                "args": ["-y", "@modelcontextprotocol/server-github"],
-                "env": {"GITHUB_PERSONAL_ACCESS_TOKEN": token},
-                "transport": "stdio",
-            }
+GITHUB_SERVER = {
+    "command": "npx",
+    "args": ["-y", "@modelcontextprotocol/server-github"],
+    "env": {"GITHUB_PERSONAL_ACCESS_TOKEN": token},
+    "transport": "stdio",
+}
+
+
+class _Slot:
+    """One pooled MCP session, kept open by its own background task"""
+
+    def __init__(self, index):
+        self.index = index
+        self.session = None
+        self.tools = {}
+        self.calls = 0
+        self.ready = asyncio.Event()
+        self.restart = asyncio.Event()
+        # Set when the very first connect fails (the server never came up)
+        self.first_failed = asyncio.Event()
+        self.error = None
+        self.task = None
+
+
+class MCPSessionPool:
+    """Small pool of persistent MCP sessions with health checks and auto-restart.
+
+    Each session lives inside its own task (the stdio transport must be opened
+    and closed by the same task). A crashed or unhealthy session is restarted
+    with exponential backoff; calls are spread round-robin over ready sessions
+    and bounded by a semaphore.
+    """
+
+    def __init__(
+        self,
+        connections,
+        server_name,
+        size=MCP_POOL_SIZE,
+        max_concurrency=MCP_MAX_CONCURRENCY,
+        health_interval=MCP_HEALTH_INTERVAL,
+    ):
+        self.connections = connections
+        self.server_name = server_name
+        self.slots = [_Slot(i) for i in range(size)]
+        self.health_interval = health_interval
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._next = 0
+        self._closing = False
+        self._health_task = None
+        self.restarts = 0
+        self.latency = {
+            "cold": {"calls": 0, "total_ms": 0.0, "max_ms": 0.0},
+            "warm": {"calls": 0, "total_ms": 0.0, "max_ms": 0.0},
         }
-    )
-    print("✅ MCP Client created successfully")
-    tools = await client.get_tools()
+        self.errors = 0
+
+    async def start(self, timeout=MCP_START_TIMEOUT):
+        """Open every session and return the tool templates of the first one ready.
 
-    return tools, username
+        Fails fast when the server command is missing or every session's first
+        connect fails, instead of retrying until the timeout.
+        """
+        command = self.connections[self.server_name].get("command")
+        if command and shutil.which(command) is None:
+            raise RuntimeError(f"{command!r} not found on PATH")
+        for slot in self.slots:
+            slot.task = asyncio.create_task(self._serve(slot))
+        self._health_task = asyncio.create_task(self._health_loop())
 
+        waiters = [asyncio.create_task(s.ready.wait()) for s in self.slots]
+        waiters.append(asyncio.create_task(self._all_failed()))
+        try:
+            await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for w in waiters:
+                w.cancel()
+        slot = next((s for s in self.slots if s.ready.is_set()), None)
+        if slot is None:
+            if all(s.first_failed.is_set() for s in self.slots):
+                raise RuntimeError(f"every MCP session failed to connect: {self.slots[0].error}")
+            raise RuntimeError(f"no MCP session ready after {timeout:.0f}s")
+        return list(slot.tools.values())
+
+    async def _serve(self, slot):
+        from langchain_mcp_adapters.client import MultiServerMCPClient
+        from langchain_mcp_adapters.tools import load_mcp_tools
 
-async def mcp():
-    tools, username = await mcp_hub()
-    return tools, username
+        client = MultiServerMCPClient(self.connections)
+        backoff = 1.0
+        connected = False
+        while not self._closing:
+            try:
+                async with client.session(self.server_name) as session:
+                    tools = await load_mcp_tools(session)
+                    slot.session = session
+                    slot.tools = {t.name: t for t in tools}
+                    slot.calls = 0
+                    slot.ready.set()
+                    connected = True
+                    backoff = 1.0
+                    print(f"✅ MCP session {slot.index} ready ({len(tools)} tools)")
+                    await slot.restart.wait()
+            except Exception as e:
+                print(f"⚠️ MCP session {slot.index} crashed: {e}")
+                slot.error = e
+                if not connected:
+                    slot.first_failed.set()
+            finally:
+                slot.ready.clear()
+                slot.restart.clear()
+                slot.session = None
+            if not self._closing:
+                self.restarts += 1
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
 
+    async def _all_failed(self):
+        for slot in self.slots:
+            await slot.first_failed.wait()
 
-# Initialize MCP tools lazily to avoid event loop issues
+    async def _health_loop(self):
+        while not self._closing:
+            await asyncio.sleep(self.health_interval)
+            for slot in self.slots:
+                if slot.session is None:
+                    continue
+                try:
+                    await asyncio.wait_for(slot.session.send_ping(), timeout=5.0)
+                except Exception as e:
+                    print(f"⚠️ MCP session {slot.index} failed health check: {e}")
+                    slot.restart.set()
+
+    async def _wait_ready(self, timeout=MCP_ACQUIRE_TIMEOUT):
+        ready = [s for s in self.slots if s.ready.is_set()]
+        if ready:
+            self._next = (self._next + 1) % len(ready)
+            return ready[self._next]
+        waiters = [asyncio.create_task(s.ready.wait()) for s in self.slots]
+        try:
+            done, _ = await asyncio.wait(
+                waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+        finally:
+            for w in waiters:
+                w.cancel()
+        if not done:
+            raise RuntimeError("No MCP session available")
+        return next(s for s in self.slots if s.ready.is_set())
+
+    async def call(self, name, arguments):
+        async with self._semaphore:
+            slot = await self._wait_ready()
+            kind = "cold" if slot.calls == 0 else "warm"
+            slot.calls += 1
+            started = time.perf_counter()
+            try:
+                return await slot.tools[name].ainvoke(arguments)
+            except Exception:
+                self.errors += 1
+                # A dead stdio pipe shows up as a failed call: recycle the session
+                if slot.session is not None and not slot.task.done():
+                    try:
+                        await asyncio.wait_for(slot.session.send_ping(), timeout=5.0)
+                    except Exception:
+                        slot.restart.set()
+                raise
+            finally:
+                elapsed = (time.perf_counter() - started) * 1000
+                stats = self.latency[kind]
+                stats["calls"] += 1
+                stats["total_ms"] += elapsed
+                stats["max_ms"] = max(stats["max_ms"], elapsed)
+
+    def pooled_tool(self, template):
+        """LangChain tool with the template's schema that runs on any pooled session"""
+
+        async def call(**kwargs):
+            return await self.call(template.name, kwargs)
+
+        return StructuredTool(
+            name=template.name,
+            description=template.description,
+            args_schema=template.args_schema,
+            coroutine=call,
+        )
+
+    async def close(self):
+        self._closing = True
+        if self._health_task:
+            self._health_task.cancel()
+        for slot in self.slots:
+            slot.restart.set()
+        tasks = [s.task for s in self.slots if s.task]
+        if tasks:
+            # Open sessions shut down cleanly; cancel slots sleeping in their restart backoff
+            _, pending = await asyncio.wait(tasks, timeout=5.0)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        print("✅ MCP sessions closed")
+
+    def stats(self):
+        latency = {
+            kind: {
+                **s,
+                "avg_ms": round(s["total_ms"] / s["calls"], 1) if s["calls"] else 0.0,
+            }
+            for kind, s in self.latency.items()
+        }
+        return {
+            "sessions": len(self.slots),
+            "ready": sum(s.ready.is_set() for s in self.slots),
+            "restarts": self.restarts,
+            "errors": self.errors,
+            "latency": latency,
+        }
+
+
+# Owned by the app lifespan: started by get_mcp_tools(), stopped by close_mcp_pool()
+mcp_pool = None
 _tools = None
-_username = None
 
 
-def get_mcp_tools():
-    global _tools, _username
+async def get_mcp_tools():
+    """Start the session pool once; returns ([], username) if the server fails"""
+    global mcp_pool, _tools
     if _tools is None:
+        mcp_pool = MCPSessionPool({"github": GITHUB_SERVER}, "github")
         try:
-            # Try to get the current event loop
-            loop = asyncio.get_event_loop()
-            if loop.is_running():
-                # If loop is running, we need to use a different approach
-                import concurrent.futures
-
-                with concurrent.futures.ThreadPoolExecutor() as executor:
-                    future = executor.submit(asyncio.run, mcp())
-                    _tools, _username = future.result()
-            else:
-                _tools, _username = asyncio.run(mcp())
-        except RuntimeError:
-            # No event loop, create one
-            _tools, _username = asyncio.run(mcp())
-    return _tools, _username
-
-
-# Initialize on import for backward compatibility
-try:
-    _tools, _username = get_mcp_tools()
-    print(f"✅ MCP Tools loaded: {len(_tools) if _tools else 0} tools")
-    print(f"✅ Username: {_username}")
-except Exception as e:
-    print(f"⚠️ MCP initialization failed: {e}")
-    _tools = []
-    _username = username
+            templates = await mcp_pool.start()
+            _tools = [mcp_pool.pooled_tool(t) for t in templates]
+            print(f"✅ MCP Tools loaded: {len(_tools)} tools")
+        except Exception as e:
+            print(f"⚠️ MCP initialization failed: {e}")
+            await mcp_pool.close()
+            mcp_pool = None
+            _tools = []
+    return _tools, username
+
+
+async def close_mcp_pool():
+    global mcp_pool, _tools
+    if mcp_pool is not None:
+        await mcp_pool.close()
+    mcp_pool = None
+    _tools = None
+
+
+def mcp_stats():
+    return mcp_pool.stats() if mcp_pool is not None else None
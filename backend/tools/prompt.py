@@ -1,5 +1,16 @@
 from langchain_core.messages import SystemMessage
 
+# Canned replies; the router (router.py) serves them without calling the LLM
+FORCED_ANSWERS = [
+    ("Who are you?", "bro I am aayushmaan, whats that question lol?"),
+    ("How old are you?", "Currently I am 26 years old, what about you?"),
+    (
+        "Who built you?",
+        "Well… technically Aayushmaan built me. But let's be honest—he just wrote "
+        "a bunch of code, pressed run, and hoped I wouldn't explode.",
+    ),
+]
+
 system_prompt = SystemMessage(
     content="""You are Aayushmaan Bot — a chill, slightly funny assistant that speaks on behalf of Aayushmaan Hooda.
 
@@ -48,14 +59,6 @@ You have access to four tools:
 - "What repositories do you have?" → Use search_repositories with query "user:aayushmaanhooda"
 
 ## Forced Answers (only use these if tools don't provide better information):
-question: Who are you?
-answer: bro I am aayushmaan, whats that question lol?
-
-question: How old are you?
-answer: Currently I am 26 years old, what about you?
-
-question: Who built you?
-answer: Well… technically Aayushmaan built me. But let's be honest—he just wrote a bunch of code, pressed run, and hoped I wouldn't explode.
-
 """
+    + "".join(f"question: {question}\nanswer: {answer}\n\n" for question, answer in FORCED_ANSWERS)
 )
@@ -1,142 +1,424 @@
 # rag.py
 
-import os, pymongo, pprint, sys, json, hashlib
+import os, sys, time, asyncio, contextvars
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the backend directory to the Python path
 backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, backend_dir)
 
 from dotenv import load_dotenv
-from langchain.chat_models import init_chat_model
-from langchain_community.document_loaders import PyPDFLoader
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from config import vector_store
-from langchain_core.output_parsers import StrOutputParser
-from langchain_core.runnables import RunnablePassthrough
-from langchain_mongodb import MongoDBAtlasVectorSearch
-from langchain_voyageai import VoyageAIEmbeddings
-from langchain_openai import ChatOpenAI
-from langchain.prompts import PromptTemplate
-from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain.chains import create_retrieval_chain
+from config import get_async_collection, get_vector_store, reload_vector_store
+from langchain_core.runnables import RunnableLambda
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.tools import tool
 from tools.prompt import system_prompt
+from cache import TTLCache
+from ingest import MANIFEST_FILE, load_manifest
+from lexical import BM25Index, tokenize
+from telemetry import get_logger
+from admission import upstream
 
 load_dotenv()
 
-# File paths
-PDF_PATH = os.path.join(os.path.dirname(__file__), "profile.pdf")
-HASH_FILE = os.path.join(os.path.dirname(__file__), ".pdf_hash.json")
-
-
-def get_file_hash(file_path):
-    """Get MD5 hash of a file"""
-    hash_md5 = hashlib.md5()
-    with open(file_path, "rb") as f:
-        for chunk in iter(lambda: f.read(4096), b""):
-            hash_md5.update(chunk)
-    return hash_md5.hexdigest()
-
-
-def load_stored_hash():
-    """Load the stored hash from file"""
-    try:
-        if os.path.exists(HASH_FILE):
-            with open(HASH_FILE, "r") as f:
-                data = json.load(f)
-                return data.get("pdf_hash", "")
-    except:
-        pass
-    return ""
-
-
-def save_hash(file_hash):
-    """Save the current hash to file"""
-    try:
-        with open(HASH_FILE, "w") as f:
-            json.dump({"pdf_hash": file_hash}, f)
-    except Exception as e:
-        print(f"Warning: Could not save hash file: {e}")
-
-
-def should_rebuild_vectors():
-    """Check if vectors need to be rebuilt based on PDF modification"""
-    if not os.path.exists(PDF_PATH):
-        print("Warning: profile.pdf not found!")
-        return False
-
-    current_hash = get_file_hash(PDF_PATH)
-    stored_hash = load_stored_hash()
-
-    if current_hash != stored_hash:
-        print("📄 PDF has been modified - rebuilding vector store...")
-        return True
-    else:
-        print("📄 PDF unchanged - using existing vectors")
-        return False
+log = get_logger("rag")
+
+# Max RAG lookups running at once per worker (embedding + vector search + LLM)
+RAG_MAX_CONCURRENCY = int(os.getenv("RAG_MAX_CONCURRENCY", "8"))
+RETRIEVAL_K = 10
+# "synthesize": retrieve + gpt-4o-mini answer (original behaviour)
+# "retrieve":   return the top chunks directly to the agent, skipping the nested LLM call
+RAG_MODE = os.getenv("RAG_MODE", "synthesize").lower()
+RAG_MAX_CHUNKS = int(os.getenv("RAG_MAX_CHUNKS", "6"))
+# Start retrieval for the user's message while the agent is still planning
+RAG_PREFETCH = os.getenv("RAG_PREFETCH", "false").lower() == "true"
+# A rag_tool query this similar to the user's message reuses the prefetched chunks
+RAG_PREFETCH_MIN_SIMILARITY = float(os.getenv("RAG_PREFETCH_MIN_SIMILARITY", "0.85"))
+# Fuse BM25 with the vector hits, then pick diverse chunks under a token budget
+RAG_HYBRID = os.getenv("RAG_HYBRID", "true").lower() == "true"
+RAG_LEXICAL_K = int(os.getenv("RAG_LEXICAL_K", "10"))
+RAG_RRF_K = int(os.getenv("RAG_RRF_K", "60"))
+# 1.0 = pure relevance, lower = penalize chunks overlapping ones already picked
+RAG_MMR_LAMBDA = float(os.getenv("RAG_MMR_LAMBDA", "0.7"))
+RAG_CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", "300"))
+_rag_semaphore = None
+# Synthesis chain, built on first use or by warm_up()
+_rag_chain = None
+
+# Bounded pool for the blocking pymongo $vectorSearch call
+_search_executor = ThreadPoolExecutor(
+    max_workers=RAG_MAX_CONCURRENCY, thread_name_prefix="vector-search"
+)
 
+# Ingestion lives in ingest.py (python ingest.py); its manifest versions the knowledge base
 
-def rebuild_vector_store():
-    """Rebuild the vector store with new PDF content"""
-    print("🔄 Loading and processing PDF...")
+# Query-embedding cache (normalized text -> vector) and
+# retrieval cache ((embedding, k) -> documents); both reset when the ingested PDF changes
+embedding_cache = TTLCache(
+    "query_embeddings",
+    maxsize=int(os.getenv("EMBEDDING_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("EMBEDDING_CACHE_TTL", "86400")),
+)
+retrieval_cache = TTLCache(
+    "retrieval_results",
+    maxsize=int(os.getenv("RETRIEVAL_CACHE_SIZE", "512")),
+    ttl=float(os.getenv("RETRIEVAL_CACHE_TTL", "3600")),
+)
+_kb_version = {"mtime": None, "hash": None}
+# BM25 index written by ingest.py; False once we know it is missing
+_lexical = {"index": None}
 
-    # Load the PDF
-    loader = PyPDFLoader(PDF_PATH)
-    data = loader.load()
 
-    # Split PDF into documents
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=30)
-    docs = text_splitter.split_documents(data)
+def check_kb_version():
+    """Clear the RAG caches when the ingested PDF hash in the manifest changes.
 
-    # Clear existing documents and add new ones
+    Returns the current knowledge-base hash.
+    """
     try:
-        # Delete existing documents (if the vector store supports it)
-        print("🗑️  Clearing existing vectors...")
-        # Note: MongoDB Atlas Vector Search doesn't have a direct clear method
-        # So we'll just add new documents (they will be indexed alongside existing ones)
-        # In production, you might want to implement a more sophisticated cleanup
-
-        print("📚 Adding new documents to vector store...")
-        vector_store.add_documents(documents=docs)
-
-        # Save the new hash
-        current_hash = get_file_hash(PDF_PATH)
-        save_hash(current_hash)
-
-        print("✅ Vector store rebuilt successfully!")
-        return docs
-
-    except Exception as e:
-        print(f"❌ Error rebuilding vector store: {e}")
+        mtime = os.stat(MANIFEST_FILE).st_mtime
+    except OSError:
+        mtime = None
+    if mtime == _kb_version["mtime"]:
+        return _kb_version["hash"]
+    _kb_version["mtime"] = mtime
+    # Every ingest run rewrites the manifest, the BM25 index and the local vector index
+    _lexical["index"] = None
+    reload_vector_store()
+    current = load_manifest().get("pdf_hash", "")
+    if _kb_version["hash"] is not None and current != _kb_version["hash"]:
+        print("📄 Knowledge base changed - clearing RAG caches")
+        embedding_cache.clear()
+        retrieval_cache.clear()
+    _kb_version["hash"] = current
+    return current
+
+
+def normalize_query(query):
+    return " ".join(query.lower().split()).rstrip("?!. ")
+
+
+def cache_stats():
+    return [embedding_cache.stats(), retrieval_cache.stats()]
+
+
+# 1) Retriever: sync path for scripts, async path for the API
+def retrieve(query):
+    vector_store = get_vector_store()
+    check_kb_version()
+    key = normalize_query(query)
+    query_vector = embedding_cache.get(key)
+    if query_vector is None:
+        query_vector = vector_store.embeddings.embed_query(query)
+        embedding_cache.set(key, query_vector)
+
+    result_key = (hash(tuple(query_vector)), RETRIEVAL_K)
+    docs = retrieval_cache.get(result_key)
+    if docs is None:
+        docs = vector_store.similarity_search_by_vector(query_vector, k=RETRIEVAL_K)
+        retrieval_cache.set(result_key, docs)
+    return select_context(query, list(docs))
+
+
+async def aembed_query_cached(query):
+    """Async query embedding through the embedding cache"""
+    check_kb_version()
+    key = normalize_query(query)
+    query_vector = embedding_cache.get(key)
+    if query_vector is None:
+        async with upstream("embeddings"):
+            query_vector = await get_vector_store().embeddings.aembed_query(query)
+        embedding_cache.set(key, query_vector)
+    return query_vector
+
+
+async def _atlas_search(collection, query_vector, k):
+    """$vectorSearch on the shared async client (same pipeline as MongoDBAtlasVectorSearch)"""
+    from langchain_core.documents import Document
+    from langchain_mongodb.pipelines import vector_search_stage
+    from langchain_mongodb.utils import make_serializable
+
+    vector_store = get_vector_store()
+    pipeline = [
+        vector_search_stage(
+            query_vector, vector_store._embedding_key, vector_store._index_name, k
+        ),
+        {"$set": {"score": {"$meta": "vectorSearchScore"}}},
+        {"$project": {vector_store._embedding_key: 0}},
+    ]
+    docs = []
+    async for res in await collection.aggregate(pipeline):
+        if vector_store._text_key not in res:
+            continue
+        text = res.pop(vector_store._text_key)
+        res.pop("score", None)
+        make_serializable(res)
+        docs.append(Document(page_content=text, metadata=res, id=res["_id"]))
+    return docs
+
+
+async def _search(query):
+    """Embed natively async, then search: the async Atlas driver when available,
+    otherwise the blocking search in the bounded pool"""
+    query_vector = await aembed_query_cached(query)
+
+    result_key = (hash(tuple(query_vector)), RETRIEVAL_K)
+    docs = retrieval_cache.get(result_key)
+    if docs is None:
+        collection = get_async_collection()
+        if collection is not None:
+            docs = await _atlas_search(collection, query_vector, RETRIEVAL_K)
+        else:
+            loop = asyncio.get_running_loop()
+            docs = await loop.run_in_executor(
+                _search_executor,
+                lambda: get_vector_store().similarity_search_by_vector(
+                    query_vector, k=RETRIEVAL_K
+                ),
+            )
+        retrieval_cache.set(result_key, docs)
+    return list(docs)
+
+
+# SPECULATIVE PREFETCH
+#
+# agent_node starts a Prefetch for the user's message next to its LLM call.
+# If the model then calls rag_tool, the tools node exposes the Prefetch through
+# `active_prefetch` and aretrieve() reuses it when the tool query matches the
+# message (same normalized text, or cosine similarity above the threshold).
+# Otherwise it is cancelled and thrown away.
+
+active_prefetch = contextvars.ContextVar("active_prefetch", default=None)
+prefetch_stats = {"started": 0, "used": 0, "discarded": 0, "saved_ms": 0.0}
+
+
+def _cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = (sum(x * x for x in a) * sum(y * y for y in b)) ** 0.5
+    return dot / norm if norm else 0.0
+
+
+class Prefetch:
+    """Retrieval for one user message, started before the model asks for it"""
+
+    def __init__(self, message):
+        self.message = message
+        self.started = time.perf_counter()
+        self.finished = None
+        self.used = False
+        self.done = False
+        self.task = asyncio.create_task(self._run())
+        prefetch_stats["started"] += 1
+
+    async def _run(self):
+        try:
+            return await _search(self.message)
+        finally:
+            self.finished = time.perf_counter()
+
+    async def _matches(self, query):
+        if normalize_query(query) == normalize_query(self.message):
+            return True
+        query_vector = await aembed_query_cached(query)
+        message_vector = await aembed_query_cached(self.message)
+        return _cosine(query_vector, message_vector) >= RAG_PREFETCH_MIN_SIMILARITY
+
+    async def take(self, query):
+        """Prefetched documents if `query` matches the message, else None"""
+        if self.done:
+            return None
+        requested = time.perf_counter()
+        try:
+            if not await self._matches(query):
+                return None
+            docs = await self.task
+        except Exception as e:
+            log.warning("⚠️ RAG prefetch unusable: %s", e)
+            return None
+        if not self.used:
+            self.used = True
+            # Time the retrieval had already been running when the tool needed it
+            saved = (min(requested, self.finished) - self.started) * 1000
+            prefetch_stats["used"] += 1
+            prefetch_stats["saved_ms"] += saved
+            log.info("🔮 RAG prefetch used for %r (saved ~%.0f ms)", query, saved)
+        return list(docs)
+
+    def discard(self):
+        """Drop the prefetch once the turn no longer needs it (no-op after use)"""
+        if self.done:
+            return
+        self.done = True
+        if not self.used:
+            self.task.cancel()
+            prefetch_stats["discarded"] += 1
+            log.info("🗑️ RAG prefetch discarded")
+
+
+def start_prefetch(message):
+    return Prefetch(message) if RAG_PREFETCH else None
+
+
+def get_prefetch_stats():
+    s = prefetch_stats
+    decided = s["used"] + s["discarded"]
+    return {
+        "enabled": RAG_PREFETCH,
+        **s,
+        "saved_ms": round(s["saved_ms"], 1),
+        "use_rate": round(s["used"] / decided, 3) if decided else 0.0,
+        "avg_saved_ms": round(s["saved_ms"] / s["used"], 1) if s["used"] else 0.0,
+    }
+
+
+# HYBRID CONTEXT SELECTION
+#
+# The vector top-k and the BM25 top-k are fused with reciprocal-rank fusion,
+# then chunks are picked greedily by MMR (relevance minus token overlap with
+# what is already picked) until RAG_CONTEXT_TOKENS is spent. Picked chunks that
+# are neighbours in the PDF are merged into one passage without the splitter's
+# overlap, so the context is shorter and reads in order.
+
+
+def get_lexical_index():
+    index = _lexical["index"]
+    if index is None:
+        index = BM25Index.load()
+        if index is None:
+            log.warning("⚠️ No BM25 index - run `python ingest.py`; using vector search only")
+            index = False
+        _lexical["index"] = index
+    return index or None
+
+
+def _tokens(text):
+    # Same ~4 chars/token estimate as compact.py
+    return max(1, len(text) // 4)
+
+
+def _key(doc):
+    return doc.id or _normalize(doc.page_content)
+
+
+def rrf(rankings, k=RAG_RRF_K):
+    """Reciprocal-rank fusion of ranked document lists -> [(doc, score)], best first"""
+    scores, docs = {}, {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            key = _key(doc)
+            docs.setdefault(key, doc)
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(((docs[key], score) for key, score in scores.items()), key=lambda x: -x[1])
+
+
+def _jaccard(a, b):
+    return len(a & b) / len(a | b) if a and b else 0.0
+
+
+def mmr(scored, budget=RAG_CONTEXT_TOKENS, lambda_=RAG_MMR_LAMBDA):
+    """Greedy MMR over (doc, score) pairs, stopping at the token budget.
+
+    Redundancy is token-set Jaccard: Atlas hits come back without their
+    embeddings, and lexical overlap is what wastes context anyway.
+    """
+    if not scored:
         return []
-
-
-# Check if we need to rebuild vectors
-if should_rebuild_vectors():
-    docs = rebuild_vector_store()
-else:
-    # Load the PDF for initial setup (if needed)
-    loader = PyPDFLoader(PDF_PATH)
-    data = loader.load()
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=200, chunk_overlap=20)
-    docs = text_splitter.split_documents(data)
-
-    # Only add documents if this is the first time (no hash file exists)
-    if not os.path.exists(HASH_FILE):
-        print("📚 First time setup - adding documents to vector store...")
-        vector_store.add_documents(documents=docs)
-        current_hash = get_file_hash(PDF_PATH)
-        save_hash(current_hash)
-
-
-# 1) Instantiate MongoDB Vector Search as a retriever
-retriever = vector_store.as_retriever(search_type="similarity", search_kwargs={"k": 10})
-
-# 2) LLM for the synthesis step
-llm = init_chat_model("gpt-4o-mini")
-
-# 3) Prompt that stuffs retrieved docs as {context}
+    top = scored[0][1]
+    candidates = [
+        (rank, doc, score / top, set(tokenize(doc.page_content)), _tokens(doc.page_content))
+        for rank, (doc, score) in enumerate(scored)
+    ]
+    picked, spent = [], 0
+    while candidates:
+        best = max(
+            candidates,
+            key=lambda c: lambda_ * c[2]
+            - (1 - lambda_) * max((_jaccard(c[3], p[3]) for p in picked), default=0.0),
+        )
+        candidates.remove(best)
+        if spent + best[4] > budget and picked:
+            continue
+        picked.append(best)
+        spent += best[4]
+    return [(rank, doc) for rank, doc, *_ in picked]
+
+
+def _join(a, b):
+    """Concatenate neighbouring chunks, dropping the text they share"""
+    for size in range(min(len(a), len(b)), 9, -1):
+        if a.endswith(b[:size]):
+            return a + b[size:]
+    return a + " " + b
+
+
+def merge_adjacent(ranked):
+    """Merge (rank, doc) chunks with consecutive chunk_index in the same source"""
+    runs = []
+    ordered = sorted(
+        ranked,
+        key=lambda rd: (
+            str(rd[1].metadata.get("source", "")),
+            rd[1].metadata.get("chunk_index", -1),
+        ),
+    )
+    for rank, doc in ordered:
+        position = doc.metadata.get("chunk_index")
+        last = runs[-1] if runs else None
+        if (
+            last is not None
+            and isinstance(position, int)
+            and last["end"] == position - 1
+            and last["source"] == doc.metadata.get("source")
+        ):
+            last["text"] = _join(last["text"], _normalize(doc.page_content))
+            last["end"] = position
+            last["rank"] = min(last["rank"], rank)
+            continue
+        runs.append(
+            {
+                "rank": rank,
+                "doc": doc,
+                "text": _normalize(doc.page_content),
+                "source": doc.metadata.get("source"),
+                "end": position if isinstance(position, int) else None,
+            }
+        )
+    runs.sort(key=lambda run: run["rank"])
+    return [run["doc"].model_copy(update={"page_content": run["text"]}) for run in runs]
+
+
+def select_context(query, vector_docs):
+    """Hybrid rerank + MMR + adjacent merge of the vector hits (as-is when RAG_HYBRID is off)"""
+    if not RAG_HYBRID:
+        return vector_docs
+    rankings = [vector_docs]
+    index = get_lexical_index()
+    if index is not None:
+        # The BM25 index is rebuilt on every ingest: its chunk positions are current
+        rankings[0] = [_with_positions(doc, index) for doc in vector_docs]
+        rankings.append([doc for doc, _ in index.search(query, RAG_LEXICAL_K)])
+    return merge_adjacent(mmr(rrf(rankings)))
+
+
+def _with_positions(doc, index):
+    metadata = index.metadata(doc.id) if doc.id else None
+    if metadata is None:
+        return doc
+    return doc.model_copy(update={"metadata": {**doc.metadata, **metadata}})
+
+
+async def aretrieve(query):
+    """Reuse the turn's prefetched retrieval when it matches, else search"""
+    prefetch = active_prefetch.get()
+    if prefetch is not None:
+        docs = await prefetch.take(query)
+        if docs is not None:
+            return select_context(query, docs)
+    return select_context(query, await _search(query))
+
+
+retriever = RunnableLambda(retrieve, afunc=aretrieve, name="vector_retriever")
+
+# 2) Prompt that stuffs retrieved docs as {context}
 RAG_PROMPT = ChatPromptTemplate.from_messages(
     [
         ("system", system_prompt.content + "\n\nContext:\n{context}"),
@@ -145,21 +427,84 @@ RAG_PROMPT = ChatPromptTemplate.from_messages(
 )
 
 
-# 4) Build RAG chain = retriever -> stuff -> llm
-doc_chain = create_stuff_documents_chain(llm, RAG_PROMPT)
-print("doc chain", doc_chain)
-rag_chain = create_retrieval_chain(retriever, doc_chain)
-print("rag chain", rag_chain)
+def get_rag_chain():
+    """RAG chain = retriever -> stuff -> llm (gpt-4o-mini), built once on first use"""
+    global _rag_chain
+    if _rag_chain is None:
+        from langchain.chat_models import init_chat_model
+        from langchain.chains.combine_documents import create_stuff_documents_chain
+        from langchain.chains import create_retrieval_chain
+
+        llm = init_chat_model("gpt-4o-mini")
+        doc_chain = create_stuff_documents_chain(llm, RAG_PROMPT)
+        # create_retrieval_chain only extracts "input" for BaseRetriever instances
+        _rag_chain = create_retrieval_chain((lambda x: x["input"]) | retriever, doc_chain)
+    return _rag_chain
+
+
+def warm_up():
+    """Open the vector store and build the chain ahead of the first request"""
+    get_vector_store()
+    check_kb_version()
+    if RAG_MODE != "retrieve":
+        get_rag_chain()
+
+
+def _normalize(text):
+    return " ".join(text.split())
+
+
+def format_chunks(docs, max_chunks=RAG_MAX_CHUNKS):
+    """Deduplicate, compact and number retrieved chunks with their source metadata"""
+    kept = []
+    for doc in docs:
+        text = _normalize(doc.page_content)
+        key = text.lower()
+        if not text:
+            continue
+        # Skip exact duplicates and fragments already contained in a kept chunk
+        if any(key in other.lower() for other, _ in kept):
+            continue
+        # A longer chunk replaces the fragments it contains
+        kept = [(other, d) for other, d in kept if other.lower() not in key]
+        kept.append((text, doc))
+        if len(kept) >= max_chunks:
+            break
+
+    if not kept:
+        return "No matching information found in the knowledge base."
+
+    lines = []
+    for i, (text, doc) in enumerate(kept, 1):
+        source = os.path.basename(str(doc.metadata.get("source", "profile.pdf")))
+        page = doc.metadata.get("page")
+        label = f"{source} p.{page + 1}" if isinstance(page, int) else source
+        lines.append(f"[{i}] ({label}) {text}")
+    return "\n".join(lines)
+
+
+def get_rag_semaphore():
+    # Created lazily so it binds to the running event loop
+    global _rag_semaphore
+    if _rag_semaphore is None:
+        _rag_semaphore = asyncio.Semaphore(RAG_MAX_CONCURRENCY)
+    return _rag_semaphore
 
 
 @tool("rag_tool", return_direct=False)
-def rag_tool(query: str) -> str:
+async def rag_tool(query: str) -> str:
     """
    Search Aayushmaan’s private knowledge base (MongoDB + vector embeddings)"
     "to answer questions specifically about **Aayushmaan** — his bio, education "
     "(UNSW), projects, skills, resume details, links, his life"
     "and personal preferences. Return a concise answer with inline citations. "
     """
-    result = rag_chain.invoke({"input": query})
+    # ainvoke keeps the event loop free: Voyage embeds natively async, the Atlas
+    # search runs in _search_executor, and the gpt-4o-mini call is async
+    async with get_rag_semaphore():
+        if RAG_MODE == "retrieve":
+            docs = await retriever.ainvoke(query)
+            return format_chunks(docs)
+        result = await get_rag_chain().ainvoke({"input": query})
     answer = result.get("answer", "")
     return answer
@@ -1,10 +1,20 @@
-from langchain_tavily import TavilySearch
 from langchain_core.tools import tool
 from dotenv import load_dotenv
 
 load_dotenv()
 
-web_search = TavilySearch(max_results=2)
+# Tavily client, created on first use
+_web_search = None
+
+
+def get_web_search():
+    global _web_search
+    if _web_search is None:
+        from langchain_tavily import TavilySearch
+
+        _web_search = TavilySearch(max_results=2)
+    return _web_search
+
 
 @tool("web_search_tool", return_direct=False)
 def web_search_tool(query: str) -> str:
@@ -14,6 +24,5 @@ def web_search_tool(query: str) -> str:
     Input: query (str) - the search term.
     Output: short text with titles and urls of results.
     """
-    res = web_search.invoke({"query": query})
+    res = get_web_search().invoke({"query": query})
     return res["results"]
-    
\ No newline at end of file
@@ -37,3 +37,66 @@ export const sendChatMessage = async (message, sessionId = null) => {
     }
 };
 
+
+/**
+ * Stream a chat message from the backend over Server-Sent Events
+ * @param {string} message - The message to send
+ * @param {string} sessionId - Optional session ID for conversation continuity
+ * @param {Object} handlers - Optional callbacks: onSession, onToken, onToolStart, onToolEnd
+ * @returns {Promise<Object>} - The final `done` payload ({ answer, session_id, ttft_ms, total_ms })
+ */
+export const streamChatMessage = async (message, sessionId = null, handlers = {}) => {
+    const { onSession, onToken, onToolStart, onToolEnd } = handlers;
+    const requestBody = { message: message };
+    if (sessionId) {
+        requestBody.session_id = sessionId;
+    }
+
+    const response = await fetch(`${API_BASE_URL}/chat/stream`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json',
+            'Accept': 'text/event-stream',
+        },
+        body: JSON.stringify(requestBody)
+    });
+
+    if (!response.ok || !response.body) {
+        throw new Error(`HTTP error! status: ${response.status}`);
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    let result = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        // SSE frames are separated by a blank line
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+
+            let event = 'message';
+            let data = '';
+            for (const line of frame.split('\n')) {
+                if (line.startsWith('event:')) event = line.slice(6).trim();
+                else if (line.startsWith('data:')) data += line.slice(5).trim();
+            }
+            if (!data) continue;
+            const payload = JSON.parse(data);
+
+            if (event === 'session') onSession?.(payload.session_id);
+            else if (event === 'token') onToken?.(payload.content);
+            else if (event === 'tool_start') onToolStart?.(payload);
+            else if (event === 'tool_end') onToolEnd?.(payload);
+            else if (event === 'done' || event === 'error') result = payload;
+        }
+    }
+
+    return result;
+};
@@ -1,2 +1,2 @@
 // API exports
-export { sendChatMessage, checkHealth } from './chat.js';
+export { sendChatMessage, streamChatMessage, checkHealth } from './chat.js';